@@ -1,4 +1,4 @@
-from .settings import Config
+from .settings import Config, CONFIG
 from .logger import logger
 
-__all__ = ["Config", "logger"]
+__all__ = ["Config", "CONFIG", "logger"]
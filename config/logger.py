@@ -3,12 +3,13 @@ import logging
 import logging.handlers
 import queue
 import atexit
-from .settings import Config
+from .settings import CONFIG
 
 
 def setup_logging() -> logging.Logger:
-    log_level = getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO)
-    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(-1)
+    log_level = getattr(logging, CONFIG.LOG_LEVEL.upper(), logging.INFO)
+    # SimpleQueue: C-level put without unfinished-task bookkeeping
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
 
     console_handler = logging.StreamHandler(sys.stdout)
     formatter = logging.Formatter(
@@ -21,6 +22,7 @@ def setup_logging() -> logging.Logger:
     listener.start()
 
     queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.listener = listener
 
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
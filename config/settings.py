@@ -1,87 +1,97 @@
 import os
-from typing import Any, Type, Optional, Union
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple, Type
 from dotenv import load_dotenv
 
 load_dotenv(override=True)
 
 
-class EnvVar:
-    """
-    Descriptor for environment variable loading.
-    Handles fetching, type casting, validation, and caching.
-    """
-
-    def __init__(
-        self,
-        key: str,
-        default: Any = None,
-        cast: Type[Any] = str,
-        required: bool = False,
-    ):
-        self.key = key
-        self.default = default
-        self.cast = cast
-        self.required = required
-        self._value: Any = None
-        self._loaded = False
-
-    def __get__(self, instance: Any, owner: Any) -> Any:
-        # Lazy load validation
-        if not self._loaded:
-            val = os.getenv(self.key)
-
-            if val is None:
-                if self.required:
-                    raise ValueError(
-                        f"Missing required environment variable: {self.key}"
-                    )
-                self._value = self.default
-            else:
-                try:
-                    if self.cast is bool:
-                        self._value = val.lower() in ("true", "1", "yes", "on")
-                    else:
-                        self._value = self.cast(val)
-                except ValueError as e:
-                    raise ValueError(
-                        f"Config '{self.key}' must be {self.cast.__name__}, got '{val}'"
-                    ) from e
-
-            self._loaded = True
-
-        return self._value
-
-
-class Config:
-    """Centralized configuration management"""
-
-    BOT_TOKEN = EnvVar("BOT_TOKEN", required=True)
-
+# (env key, cast, default, required)
+_ENV_SPEC: Tuple[Tuple[str, Type[Any], Any, bool], ...] = (
+    ("BOT_TOKEN", str, None, True),
     # Default Provider Selection
-    PROVIDER_NAME = EnvVar("PROVIDER_NAME", default="perplexity")
-
+    ("PROVIDER_NAME", str, "perplexity", False),
     # Perplexity Config
-    PERPLEXITY_COOKIES = EnvVar("PERPLEXITY_COOKIES")
-    PERPLEXITY_MODEL = EnvVar("PERPLEXITY_MODEL")
-
+    ("PERPLEXITY_COOKIES", str, None, False),
+    ("PERPLEXITY_MODEL", str, None, False),
     # Groq Config
-    GROQ_API_KEY = EnvVar("GROQ_API_KEY")
-    GROQ_MODEL = EnvVar("GROQ_MODEL", default="llama-3.3-70b-versatile")
-
+    ("GROQ_API_KEY", str, None, False),
+    ("GROQ_MODEL", str, "llama-3.3-70b-versatile", False),
     # Web Server & Tunneling
-    WEB_HOST = EnvVar("WEB_HOST", default="127.0.0.1")
-    WEB_PORT = EnvVar("WEB_PORT", default=5003, cast=int)
-    NGROK_AUTH_TOKEN = EnvVar("NGROK_AUTH_TOKEN", default="")
-    NGROK_DOMAIN = EnvVar("NGROK_DOMAIN")
-
-    DATABASE_PATH = EnvVar("DATABASE_PATH", default="var/bot.sqlite3")
-    LOG_LEVEL = EnvVar("LOG_LEVEL", default="INFO")
+    ("WEB_HOST", str, "127.0.0.1", False),
+    ("WEB_PORT", int, 5003, False),
+    ("NGROK_AUTH_TOKEN", str, "", False),
+    ("NGROK_DOMAIN", str, None, False),
+    ("DATABASE_PATH", str, "var/bot.sqlite3", False),
+    ("LOG_LEVEL", str, "INFO", False),
+    ("MAX_MESSAGE_LENGTH", int, 4096, False),
+    ("SAFE_MESSAGE_LENGTH", int, 4000, False),
+    ("MIN_UPDATE_INTERVAL", float, 3.0, False),
+    ("MAX_UPDATE_INTERVAL", float, 10.0, False),
+    ("INITIAL_RETRY_DELAY", float, 1.0, False),
+    ("MAX_RETRY_DELAY", float, 60.0, False),
+    ("MAX_RETRIES", int, 5, False),
+)
+
+
+def _cast_env(key: str, cast: Type[Any], raw: str) -> Any:
+    """Cast a raw environment string to its configured type"""
+    if cast is bool:
+        return raw.lower() in ("true", "1", "yes", "on")
+    try:
+        return cast(raw)
+    except ValueError as e:
+        raise ValueError(
+            f"Config '{key}' must be {cast.__name__}, got '{raw}'"
+        ) from e
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """
+    Centralized configuration management.
 
-    MAX_MESSAGE_LENGTH = EnvVar("MAX_MESSAGE_LENGTH", default=4096, cast=int)
-    SAFE_MESSAGE_LENGTH = EnvVar("SAFE_MESSAGE_LENGTH", default=4000, cast=int)
+    Values are resolved from the environment exactly once via `load()`,
+    so every `CONFIG.X` read is a plain attribute fetch with no descriptor
+    dispatch or `os.getenv` call in hot paths.
+    """
 
-    MIN_UPDATE_INTERVAL = EnvVar("MIN_UPDATE_INTERVAL", default=3.0, cast=float)
-    MAX_UPDATE_INTERVAL = EnvVar("MAX_UPDATE_INTERVAL", default=10.0, cast=float)
-    INITIAL_RETRY_DELAY = EnvVar("INITIAL_RETRY_DELAY", default=1.0, cast=float)
-    MAX_RETRY_DELAY = EnvVar("MAX_RETRY_DELAY", default=60.0, cast=float)
-    MAX_RETRIES = EnvVar("MAX_RETRIES", default=5, cast=int)
+    BOT_TOKEN: Optional[str]
+    PROVIDER_NAME: str
+    PERPLEXITY_COOKIES: Optional[str]
+    PERPLEXITY_MODEL: Optional[str]
+    GROQ_API_KEY: Optional[str]
+    GROQ_MODEL: str
+    WEB_HOST: str
+    WEB_PORT: int
+    NGROK_AUTH_TOKEN: str
+    NGROK_DOMAIN: Optional[str]
+    DATABASE_PATH: str
+    LOG_LEVEL: str
+    MAX_MESSAGE_LENGTH: int
+    SAFE_MESSAGE_LENGTH: int
+    MIN_UPDATE_INTERVAL: float
+    MAX_UPDATE_INTERVAL: float
+    INITIAL_RETRY_DELAY: float
+    MAX_RETRY_DELAY: float
+    MAX_RETRIES: int
+
+    @classmethod
+    def load(cls) -> "Config":
+        """Build a frozen instance from the current environment"""
+        values = {}
+        for key, cast, default, _required in _ENV_SPEC:
+            raw = os.getenv(key)
+            values[key] = default if raw is None else _cast_env(key, cast, raw)
+        return cls(**values)
+
+    def validate(self) -> None:
+        """Raise for any required variable still unset (call at startup)"""
+        for key, _cast, _default, required in _ENV_SPEC:
+            if required and getattr(self, key) is None:
+                raise ValueError(f"Missing required environment variable: {key}")
+
+
+# Eager single-shot warmup: every env read and cast happens here at import,
+# so the first streamed response pays no config-resolution cost
+CONFIG = Config.load()
@@ -3,16 +3,18 @@ from providers import ProviderManager
 from utils import WebServer, MessageFormatter
 from .handlers import KeyboardHandler
 from storage import Conversation, MessageRole, ProviderCapability, Asset
-from config import Config, logger
+from config import CONFIG, logger
 from providers.base import AttachmentInput
 from decorators import operation, resilient_request
 import asyncio
 import uuid
 import secrets
-from typing import Dict, Tuple, List, Optional, cast, Any
-import traceback
+from collections import OrderedDict, defaultdict, deque
+from typing import DefaultDict, Deque, Dict, Tuple, List, Optional, cast, Any
 import time
 import mimetypes
+import os.path
+from functools import lru_cache
 from io import BytesIO
 from aiogram import Bot
 from aiogram.types import (
@@ -24,6 +26,55 @@ from aiogram.types import (
     Document,
 )
 from aiogram.enums import ParseMode
+from dataclasses import dataclass, field
+
+mimetypes.init()
+
+# Resolved once; avoids per-call enum lookup when streaming edits
+_MARKDOWN_V2 = ParseMode.MARKDOWN_V2
+
+_ATTACH_CAPS = frozenset(
+    (ProviderCapability.ACCEPTS_FILES, ProviderCapability.ACCEPTS_IMAGES)
+)
+
+
+@lru_cache(maxsize=1024)
+def _chat_public_id(chat_id: int) -> str:
+    """Public form of a supergroup chat id for t.me links.
+
+    Prefix check rather than replace(): the latter scans the whole string
+    and would also strip a '-100' occurring mid-id.
+    """
+    s = str(chat_id)
+    return s[4:] if s.startswith("-100") else s
+
+
+@lru_cache(maxsize=256)
+def _mime_for_ext(ext: str) -> str:
+    """MIME type for a lowercased extension; uploads skew to a few types"""
+    mime, _ = mimetypes.guess_type("x" + ext)
+    return mime or "application/octet-stream"
+
+
+@dataclass(slots=True)
+class _MediaGroup:
+    """In-flight media group buffer entry"""
+
+    message: Message
+    last_seen: float
+    files: List[AttachmentInput] = field(default_factory=list)
+    caption: Optional[str] = None
+    task: Optional["asyncio.Task[None]"] = None
+
+
+@dataclass
+class StreamState:
+    """Per-response streaming state: sent message ids and last format result"""
+
+    sent: Dict[int, Tuple[int, str]] = field(default_factory=dict)
+    last_text_len: int = -1
+    last_messages: List[str] = field(default_factory=list)
+    last_assets: List[Asset] = field(default_factory=list)
 
 
 class BotController:
@@ -41,8 +92,25 @@ class BotController:
         self.web_server = web_server
         self.formatter = formatter
         self.keyboard_handler = KeyboardHandler(storage, provider_manager)
-        self._pending_attachments: Dict[int, List[AttachmentInput]] = {}
-        self._media_group_buffer: Dict[str, Dict[str, Any]] = {}
+        # Bounded per-user backlog: deque avoids setdefault's throwaway list
+        # allocation and caps memory under noisy senders
+        self._pending_attachments: DefaultDict[
+            int, Deque[AttachmentInput]
+        ] = defaultdict(lambda: deque(maxlen=32))
+        self._media_group_buffer: Dict[str, _MediaGroup] = {}
+        # Hash of the text last pushed to each (chat_id, message_id); lets us
+        # skip edits Telegram would reject with "message is not modified".
+        # LRU-capped: entries for finished streams are dropped in _finalize,
+        # the cap covers streams that die on the error path
+        self._last_edit_hash: "OrderedDict[Tuple[int, int], int]" = OrderedDict()
+        self._last_edit_hash_max = 1024
+        # LRU of recently used conversations keyed by (chat_id, topic_id);
+        # hot topics skip the per-message SQLite round-trip
+        self._conv_cache: "OrderedDict[Tuple[int, int], Conversation]" = OrderedDict()
+        self._conv_cache_max = 256
+        # Saves from other paths (e.g. the settings menu) replace the
+        # cached object so a hot topic never generates with stale meta_data
+        self.storage.add_conversation_saved_listener(self._cache_conversation)
 
     @resilient_request(scope="telegram", max_retries=3)
     async def _send_message(self, chat_id: int, **kwargs: Any) -> Message:
@@ -84,11 +152,9 @@ class BotController:
             logger.warning(f"Failed to download file: {e}")
             return
 
-        attachment: AttachmentInput = {
-            "filename": filename,
-            "content_type": mime_type,
-            "data": file_data,
-        }
+        attachment = AttachmentInput(
+            filename=filename, content_type=mime_type, data=file_data
+        )
 
         if message.media_group_id:
             await self._buffer_media_group(message, attachment)
@@ -102,7 +168,7 @@ class BotController:
             if not message.from_user:
                 return
             user_id = message.from_user.id
-            self._pending_attachments.setdefault(user_id, []).append(attachment)
+            self._pending_attachments[user_id].append(attachment)
             await message.reply("File attached. Please send your prompt.", quote=True)
 
     async def _download_file(
@@ -130,7 +196,7 @@ class BotController:
 
         buf = BytesIO()
         await self.bot.download_file(file.file_path, destination=buf)
-        return buf.getvalue(), filename, mime_type
+        return bytes(buf.getbuffer()), filename, mime_type
 
     async def _buffer_media_group(
         self, message: Message, attachment: AttachmentInput
@@ -140,33 +206,34 @@ class BotController:
         if not mg_id:
             return
 
-        if mg_id not in self._media_group_buffer:
-            self._media_group_buffer[mg_id] = {
-                "files": [],
-                "caption": None,
-                "message": message,
-                "task": None,
-            }
-
-        group = self._media_group_buffer[mg_id]
-        group["files"].append(attachment)
+        group = self._media_group_buffer.get(mg_id)
+        if group is None:
+            group = self._media_group_buffer[mg_id] = _MediaGroup(
+                message=message, last_seen=time.monotonic()
+            )
 
-        if message.caption and not group["caption"]:
-            group["caption"] = message.caption
-            group["message"] = message
+        group.files.append(attachment)
+        group.last_seen = time.monotonic()
 
-        if group["task"]:
-            group["task"].cancel()
+        if message.caption and not group.caption:
+            group.caption = message.caption
+            group.message = message
 
-        group["task"] = asyncio.create_task(self._media_group_timer(mg_id))
+        # One long-lived debounce task per group; new arrivals only bump
+        # last_seen instead of cancelling and respawning the timer
+        if group.task is None:
+            group.task = asyncio.create_task(self._media_group_timer(mg_id))
 
     async def _media_group_timer(self, mg_id: str) -> None:
-        """Wait for more files, then finalize"""
-        try:
+        """Wait until no new files arrive for the debounce window, then finalize"""
+        while True:
             await asyncio.sleep(1.5)
-            await self._finalize_media_group(mg_id)
-        except asyncio.CancelledError:
-            pass
+            group = self._media_group_buffer.get(mg_id)
+            if group is None:
+                return
+            if time.monotonic() - group.last_seen >= 1.5:
+                break
+        await self._finalize_media_group(mg_id)
 
     async def _finalize_media_group(self, mg_id: str) -> None:
         """Process the complete media group"""
@@ -174,9 +241,9 @@ class BotController:
             return
 
         group = self._media_group_buffer.pop(mg_id)
-        message = group["message"]
-        attachments = group["files"]
-        caption = group["caption"]
+        message = group.message
+        attachments = group.files
+        caption = group.caption
 
         if caption:
             await self._process_conversation_flow(
@@ -185,7 +252,7 @@ class BotController:
         else:
             if message.from_user:
                 user_id = message.from_user.id
-                self._pending_attachments.setdefault(user_id, []).extend(attachments)
+                self._pending_attachments[user_id].extend(attachments)
                 await message.reply(
                     f"Received {len(attachments)} files. Please send your prompt.",
                     quote=True,
@@ -204,8 +271,8 @@ class BotController:
         chat_id = message.chat.id
         thread_id = message.message_thread_id
 
-        pending = self._pending_attachments.pop(user_id, [])
-        all_attachments = pending + (immediate_attachments or [])
+        all_attachments = list(self._pending_attachments.pop(user_id, ()))
+        all_attachments.extend(immediate_attachments or ())
 
         is_general_topic = thread_id in (1, None)
         if is_general_topic:
@@ -263,9 +330,13 @@ class BotController:
                 await message.answer(f"Failed to create topic: {e}")
                 return
         else:
-            conversation = await self.storage.load_conversation(
-                chat_id=chat_id, topic_id=thread_id
-            )
+            conversation = self._conv_cache.get((chat_id, thread_id))
+            if conversation is not None:
+                self._conv_cache.move_to_end((chat_id, thread_id))
+            else:
+                conversation = await self.storage.load_conversation(
+                    chat_id=chat_id, topic_id=thread_id
+                )
             if not conversation:
                 await message.answer("No conversation found in this topic.")
                 return
@@ -279,6 +350,7 @@ class BotController:
             },
         )
         await self.storage.save_conversation(conversation)
+        self._cache_conversation(conversation)
 
         thinking_msg = await self._send_message(
             chat_id=chat_id, message_thread_id=thread_id, text="Thinking..."
@@ -290,6 +362,16 @@ class BotController:
             attachments=all_attachments,
         )
 
+    def _cache_conversation(self, conversation: Conversation) -> None:
+        """Insert or refresh a conversation in the LRU, evicting the oldest"""
+        if conversation.topic_id is None:
+            return
+        key = (conversation.chat_id, conversation.topic_id)
+        self._conv_cache[key] = conversation
+        self._conv_cache.move_to_end(key)
+        if len(self._conv_cache) > self._conv_cache_max:
+            self._conv_cache.popitem(last=False)
+
     async def _generate_and_stream_response(
         self,
         conversation: Conversation,
@@ -302,18 +384,21 @@ class BotController:
 
             provider = self.provider_manager.get_provider(provider_name, model)
 
-            accumulated_text = ""
-            last_update_time = time.time()
-            sent_messages: Dict[int, Tuple[int, str]] = {}
-
-            caps = getattr(provider, "capabilities", [])
-            supports_attachments = any(
-                c in caps
-                for c in (
-                    ProviderCapability.ACCEPTS_FILES,
-                    ProviderCapability.ACCEPTS_IMAGES,
-                )
-            )
+            # List buffer avoids quadratic str += growth; the time gate is
+            # only consulted every few chunks to keep per-token overhead low
+            parts: List[str] = []
+            total_len = 0
+            chunks_since_check = 0
+            check_every = 16
+            _monotonic = time.monotonic
+            _min_interval = CONFIG.MIN_UPDATE_INTERVAL
+            _append = parts.append
+            last_update_time = _monotonic()
+            last_pushed_len = 0
+            state = StreamState()
+
+            caps = frozenset(getattr(provider, "capabilities", ()))
+            supports_attachments = bool(caps & _ATTACH_CAPS)
 
             if supports_attachments and attachments:
                 response_generator = provider.generate_response(
@@ -334,17 +419,29 @@ class BotController:
                 )
 
             async for chunk in response_generator:
-                accumulated_text += chunk
-                if time.time() - last_update_time >= 2.0 and len(accumulated_text) > 50:
-                    await self._update_messages(
-                        accumulated_text, thinking_msg, sent_messages
-                    )
-                    last_update_time = time.time()
+                _append(chunk)
+                total_len += len(chunk)
+                chunks_since_check += 1
+                if chunks_since_check >= check_every:
+                    chunks_since_check = 0
+                    now = _monotonic()
+                    # Delta gate: an intermediate edit costs a format pass plus
+                    # a Telegram round-trip, so only push once enough new text
+                    # accumulated to be visible to the reader
+                    if (
+                        now - last_update_time >= _min_interval
+                        and total_len > 50
+                        and total_len - last_pushed_len >= 200
+                    ):
+                        await self._update_messages(
+                            "".join(parts), thinking_msg, state
+                        )
+                        last_pushed_len = total_len
+                        last_update_time = _monotonic()
 
+            accumulated_text = "".join(parts)
             if accumulated_text:
-                await self._update_messages(
-                    accumulated_text, thinking_msg, sent_messages
-                )
+                await self._update_messages(accumulated_text, thinking_msg, state)
 
             conversation.add_message(
                 role=MessageRole.ASSISTANT,
@@ -352,86 +449,142 @@ class BotController:
                 meta_data={"message_id": thinking_msg.message_id},
             )
             await self.storage.save_conversation(conversation)
+            self._cache_conversation(conversation)
 
-            await self._finalize(
-                conversation, thinking_msg, sent_messages, accumulated_text
-            )
+            await self._finalize(conversation, thinking_msg, state, accumulated_text)
 
         except Exception as e:
-            logger.error(f"Error in generation: {e}\n{traceback.format_exc()}")
+            logger.exception("Error in generation: %s", e)
             error_msg = f"Error: {str(e)}"
-            if len(error_msg) > Config.SAFE_MESSAGE_LENGTH:
-                error_msg = error_msg[: Config.SAFE_MESSAGE_LENGTH] + "..."
+            if len(error_msg) > CONFIG.SAFE_MESSAGE_LENGTH:
+                error_msg = error_msg[: CONFIG.SAFE_MESSAGE_LENGTH] + "..."
             await self._edit_message_text(
                 chat_id=thinking_msg.chat.id,
                 message_id=thinking_msg.message_id,
                 text=error_msg,
             )
 
+    async def _format_cached(
+        self, text: str, state: StreamState
+    ) -> Tuple[List[str], List[Asset]]:
+        """Format text once per stream position.
+
+        The streamed buffer is append-only, so its length uniquely identifies
+        the content; repeated calls for the same prefix (e.g. the final flush
+        followed by _finalize) reuse the parsed result instead of re-running
+        the formatter.
+        """
+        if state.last_text_len != len(text):
+            messages, assets = await self.formatter.format_response_for_telegram(text)
+            state.last_text_len = len(text)
+            state.last_messages = messages
+            state.last_assets = assets
+        return state.last_messages, state.last_assets
+
+    async def _edit_text_if_changed(
+        self, chat_id: int, message_id: int, text: str, **kwargs: Any
+    ) -> bool:
+        """Edit a message only when the text actually changed since last push"""
+        key = (chat_id, message_id)
+        h = hash(text)
+        if self._last_edit_hash.get(key) == h:
+            return True
+        result = await self._edit_message_text(
+            chat_id=chat_id, message_id=message_id, text=text, **kwargs
+        )
+        self._last_edit_hash[key] = h
+        self._last_edit_hash.move_to_end(key)
+        while len(self._last_edit_hash) > self._last_edit_hash_max:
+            self._last_edit_hash.popitem(last=False)
+        return bool(result)
+
     async def _update_messages(
         self,
         accumulated_text: str,
         thinking_msg: Message,
-        sent_messages: Dict[int, Tuple[int, str]],
+        state: StreamState,
     ) -> None:
-        messages, _ = await self.formatter.format_response_for_telegram(
-            accumulated_text
-        )
-        if messages:
-            for i, msg_content in enumerate(messages):
-                if i == 0:
-                    if 0 not in sent_messages or sent_messages[0][1] != msg_content:
-                        try:
-                            await self._edit_message_text(
-                                chat_id=thinking_msg.chat.id,
-                                message_id=thinking_msg.message_id,
-                                text=msg_content,
-                                parse_mode=ParseMode.MARKDOWN_V2,
-                            )
-                            sent_messages[0] = (thinking_msg.message_id, msg_content)
-                        except:
-                            pass
-                else:
-                    if i in sent_messages:
-                        msg_id, last_content = sent_messages[i]
-                        if msg_content != last_content:
-                            try:
-                                await self._edit_message_text(
-                                    chat_id=thinking_msg.chat.id,
-                                    message_id=msg_id,
-                                    text=msg_content,
-                                    parse_mode=ParseMode.MARKDOWN_V2,
-                                )
-                                sent_messages[i] = (msg_id, msg_content)
-                            except:
-                                pass
-                    else:
-                        new_msg = await self._send_message(
+        sent_messages = state.sent
+        messages, _ = await self._format_cached(accumulated_text, state)
+        if not messages:
+            return
+
+        # The thinking message's id is reused, so its edit stays serial
+        first_content = messages[0]
+        if 0 not in sent_messages or sent_messages[0][1] != first_content:
+            try:
+                await self._edit_text_if_changed(
+                    chat_id=thinking_msg.chat.id,
+                    message_id=thinking_msg.message_id,
+                    text=first_content,
+                    parse_mode=_MARKDOWN_V2,
+                )
+                sent_messages[0] = (thinking_msg.message_id, first_content)
+            except:
+                pass
+
+        # Edits target already-placed message ids, so they can share one
+        # round trip. First-time sends stay sequential: Telegram orders
+        # messages by arrival, and two new parts racing through a gather
+        # could land swapped in the chat permanently.
+        edit_tasks = []
+        edit_pending: List[Tuple[int, int, str]] = []
+        new_parts: List[Tuple[int, str]] = []
+        for i, msg_content in enumerate(messages[1:], start=1):
+            if i in sent_messages:
+                msg_id, last_content = sent_messages[i]
+                if msg_content != last_content:
+                    edit_tasks.append(
+                        self._edit_text_if_changed(
                             chat_id=thinking_msg.chat.id,
-                            message_thread_id=thinking_msg.message_thread_id,
+                            message_id=msg_id,
                             text=msg_content,
-                            reply_to_message_id=thinking_msg.message_id,
-                            parse_mode=ParseMode.MARKDOWN_V2,
+                            parse_mode=_MARKDOWN_V2,
                         )
-                        sent_messages[i] = (new_msg.message_id, msg_content)
-            await asyncio.sleep(0.3)
+                    )
+                    edit_pending.append((i, msg_id, msg_content))
+            else:
+                new_parts.append((i, msg_content))
+
+        if edit_tasks:
+            results = await asyncio.gather(*edit_tasks, return_exceptions=True)
+            for (i, msg_id, msg_content), result in zip(edit_pending, results):
+                if isinstance(result, BaseException):
+                    continue
+                sent_messages[i] = (msg_id, msg_content)
+
+        for i, msg_content in new_parts:
+            try:
+                sent = await self._send_message(
+                    chat_id=thinking_msg.chat.id,
+                    message_thread_id=thinking_msg.message_thread_id,
+                    text=msg_content,
+                    reply_to_message_id=thinking_msg.message_id,
+                    parse_mode=_MARKDOWN_V2,
+                )
+            except Exception:
+                continue
+            sent_messages[i] = (sent.message_id, msg_content)
+
+        await asyncio.sleep(0.3)
 
     async def _finalize(
         self,
         conversation: Conversation,
         first_message: Message,
-        sent_messages: Dict[int, Tuple[int, str]],
+        state: StreamState,
         full_text: str,
     ) -> None:
-        messages, assets = await self.formatter.format_response_for_telegram(full_text)
+        sent_messages = state.sent
+        messages, assets = await self._format_cached(full_text, state)
         page_id = secrets.token_urlsafe(16)
 
         await self.storage.save_web_page(
             page_id, conversation.conversation_id, len(conversation.messages) - 1
         )
 
-        for asset in assets:
-            await self.storage.save_asset(page_id, asset)
+        if assets:
+            await self.storage.save_assets(page_id, assets)
 
         model = conversation.model
         provider_name = conversation.provider or "perplexity"
@@ -449,7 +602,7 @@ class BotController:
                     message_id=msg_id,
                     text=messages[last_idx],
                     reply_markup=keyboard,
-                    parse_mode=ParseMode.MARKDOWN_V2,
+                    parse_mode=_MARKDOWN_V2,
                 )
             except:
                 await self._edit_message_reply_markup(
@@ -458,6 +611,10 @@ class BotController:
                     reply_markup=keyboard,
                 )
 
+        # The stream is done: these messages are never edit-deduped again
+        for sent_id, _ in sent_messages.values():
+            self._last_edit_hash.pop((first_message.chat.id, sent_id), None)
+
     def _create_keyboard(
         self,
         page_id: str,
@@ -498,14 +655,13 @@ class BotController:
         return InlineKeyboardMarkup(inline_keyboard=buttons)
 
     def _guess_content_type(self, filename: str) -> str:
-        mime, _ = mimetypes.guess_type(filename)
-        return mime or "application/octet-stream"
+        return _mime_for_ext(os.path.splitext(filename)[1].lower())
 
     def _generate_topic_name(self, text: str) -> str:
         return (text[:47] + "...") if len(text) > 50 else text or "New Conversation"
 
     def _get_topic_url(self, chat_id: int, topic_id: int) -> str:
-        return f"https://t.me/c/{str(chat_id).replace('-100', '')}/{topic_id}"
+        return f"https://t.me/c/{_chat_public_id(chat_id)}/{topic_id}"
 
     async def _get_or_create_conversation_for_message(
         self, message: Message
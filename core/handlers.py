@@ -1,6 +1,6 @@
 from storage import DatabaseManager
 from providers import ProviderManager
-from decorators import operation, resilient_request
+from decorators import cpu_bound, operation, resilient_request
 from config import logger
 
 from aiogram.types import (
@@ -10,10 +10,93 @@ from aiogram.types import (
     BufferedInputFile,
     Message,
 )
-import hashlib
-import json
+import asyncio
+import time
+import orjson
+from collections import OrderedDict
 from typing import List, Optional, Dict, Any, cast
 from abc import ABC, abstractmethod
+from functools import lru_cache
+
+
+def _dumps(obj: Any) -> str:
+    """orjson encode to str; keyboard_states stores Text rows"""
+    return orjson.dumps(obj).decode()
+
+
+def _loads(data: str) -> Any:
+    return orjson.loads(data)
+
+
+# Menus for a given context and settings render to identical markup, so the
+# pydantic model construction is memoized; aiogram never mutates the shared
+# keyboard objects, making reference reuse across requests safe.
+@lru_cache(maxsize=512)
+def _build_root_menu_cached(
+    scope: str, short_id: str, provider: str, model: str
+) -> InlineKeyboardMarkup:
+    # model_construct skips pydantic validation; every field here is an
+    # internally built literal, so the schema check adds nothing
+    return InlineKeyboardMarkup.model_construct(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton.model_construct(
+                    text=f"Provider: {provider}",
+                    callback_data=f"settings:{scope}:nav:{short_id}:prov",
+                )
+            ],
+            [
+                InlineKeyboardButton.model_construct(
+                    text=f"Model: {model}",
+                    callback_data=f"settings:{scope}:nav:{short_id}:mod",
+                )
+            ],
+            [
+                InlineKeyboardButton.model_construct(
+                    text="< Back",
+                    callback_data=f"settings:{scope}:close:{short_id}",
+                )
+            ],
+        ]
+    )
+
+
+@lru_cache(maxsize=512)
+def _build_list_menu_cached(
+    scope: str, short_id: str, items: "tuple[str, ...]", category: str
+) -> InlineKeyboardMarkup:
+    # Candidates come from deterministically ordered registries, so the
+    # list index is a stable token within a rendered menu and costs no
+    # hashing on either side of the round trip
+    buttons = [
+        [
+            InlineKeyboardButton.model_construct(
+                text=item,
+                callback_data=f"settings:{scope}:pick:{short_id}:{category}:{i}",
+            )
+        ]
+        for i, item in enumerate(items)
+    ]
+
+    buttons.append(
+        [
+            InlineKeyboardButton.model_construct(
+                text="< Back", callback_data=f"settings:{scope}:nav:{short_id}:root"
+            )
+        ]
+    )
+    return InlineKeyboardMarkup.model_construct(inline_keyboard=buttons)
+
+
+# Keyboards past this size get (de)serialized in the thread executor so the
+# nested row/button loops do not stall the event loop; small keyboards stay
+# inline to avoid executor dispatch overhead.
+_OFFLOAD_ROWS = 16
+_OFFLOAD_JSON_CHARS = 2048
+
+# Write-behind batching: bursts of menu clicks coalesce into one transaction
+# instead of one commit (and fsync) per callback
+_BATCH_WINDOW = 0.025
 
 
 class KeyboardStateManager:
@@ -21,10 +104,15 @@ class KeyboardStateManager:
 
     def __init__(self, storage: DatabaseManager):
         self.storage = storage
+        # Pending write-behind payloads; restore reads here first so a
+        # not-yet-flushed state is never stale
+        self._pending: Dict[str, str] = {}
+        self._write_queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._writer_task: Optional["asyncio.Task[None]"] = None
 
     @staticmethod
     def serialize_keyboard(keyboard: InlineKeyboardMarkup) -> str:
-        return json.dumps(
+        return _dumps(
             {
                 "inline_keyboard": [
                     [
@@ -42,44 +130,95 @@ class KeyboardStateManager:
 
     @staticmethod
     def deserialize_keyboard(keyboard_json: str) -> InlineKeyboardMarkup:
-        keyboard_data = json.loads(keyboard_json)
+        keyboard_data = _loads(keyboard_json)
         buttons = []
         for row in keyboard_data["inline_keyboard"]:
             button_row = []
             for btn_data in row:
                 if "url" in btn_data and btn_data.get("url"):
                     button_row.append(
-                        InlineKeyboardButton(text=btn_data["text"], url=btn_data["url"])
+                        InlineKeyboardButton.model_construct(
+                            text=btn_data["text"], url=btn_data["url"]
+                        )
                     )
                 elif "callback_data" in btn_data and btn_data.get("callback_data"):
                     button_row.append(
-                        InlineKeyboardButton(
+                        InlineKeyboardButton.model_construct(
                             text=btn_data["text"],
                             callback_data=btn_data["callback_data"],
                         )
                     )
             buttons.append(button_row)
-        return InlineKeyboardMarkup(inline_keyboard=buttons)
+        return InlineKeyboardMarkup.model_construct(inline_keyboard=buttons)
 
     async def save_keyboard_state(
         self, context_id: str, keyboard: InlineKeyboardMarkup
     ) -> None:
         if not keyboard:
             return
-        keyboard_json = self.serialize_keyboard(keyboard)
-        await self.storage.save_keyboard_state(f"settings_{context_id}", keyboard_json)
+        if len(keyboard.inline_keyboard) > _OFFLOAD_ROWS:
+            keyboard_json = await _serialize_keyboard_offloop(keyboard)
+        else:
+            keyboard_json = self.serialize_keyboard(keyboard)
+        key = f"settings_{context_id}"
+        self._pending[key] = keyboard_json
+        self._ensure_writer()
+        self._write_queue.put_nowait(key)
 
     async def restore_keyboard_state(
         self, context_id: str
     ) -> Optional[InlineKeyboardMarkup]:
-        keyboard_json = await self.storage.load_keyboard_state(f"settings_{context_id}")
+        key = f"settings_{context_id}"
+        keyboard_json = self._pending.get(key)
+        if keyboard_json is None:
+            keyboard_json = await self.storage.load_keyboard_state(key)
         if not keyboard_json:
             return None
+        if len(keyboard_json) > _OFFLOAD_JSON_CHARS:
+            return cast(
+                InlineKeyboardMarkup, await _deserialize_keyboard_offloop(keyboard_json)
+            )
         return self.deserialize_keyboard(keyboard_json)
 
     async def delete_keyboard_state(self, context_id: str) -> None:
+        self._pending.pop(f"settings_{context_id}", None)
         await self.storage.delete_keyboard_state(f"settings_{context_id}")
 
+    async def flush(self) -> None:
+        """Write all pending keyboard states in one transaction"""
+        if not self._pending:
+            return
+        items = list(self._pending.items())
+        # Entries stay in the pending map until the write commits, so a
+        # restore racing the in-flight write still sees them and a failed
+        # bulk write leaves everything staged for the next flush
+        await self.storage.save_keyboard_states_bulk(items)
+        for key, value in items:
+            if self._pending.get(key) is value:
+                del self._pending[key]
+
+    def _ensure_writer(self) -> None:
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.get_running_loop().create_task(
+                self._write_loop()
+            )
+
+    async def _write_loop(self) -> None:
+        while True:
+            await self._write_queue.get()
+            # Let the rest of the burst land before committing
+            await asyncio.sleep(_BATCH_WINDOW)
+            while not self._write_queue.empty():
+                self._write_queue.get_nowait()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Keyboard state batch write failed: {e}")
+
+
+_serialize_keyboard_offloop = cpu_bound(KeyboardStateManager.serialize_keyboard)
+_deserialize_keyboard_offloop = cpu_bound(KeyboardStateManager.deserialize_keyboard)
+
 
 class SettingsStrategy(ABC):
     """Abstract strategy for handling settings logic (Conversation vs User)"""
@@ -94,8 +233,10 @@ class SettingsStrategy(ABC):
         pass
 
     @abstractmethod
-    async def update_settings(self, context_id: str, key: str, value: str) -> None:
-        """Update a setting"""
+    async def update_settings(
+        self, context_id: str, key: str, value: str
+    ) -> Dict[str, str]:
+        """Update a setting and return the resulting settings dict"""
         pass
 
     @abstractmethod
@@ -105,7 +246,8 @@ class SettingsStrategy(ABC):
 
 class ConversationStrategy(SettingsStrategy):
     async def get_settings(self, context_id: str) -> Dict[str, str]:
-        conv = await self.storage.get_conversation_by_id(context_id)
+        # Metadata-only load: rendering the menu never needs the messages
+        conv = await self.storage.get_conversation_meta(context_id)
         if not conv:
             return {"provider": "perplexity", "model": "auto"}
         return {
@@ -113,13 +255,20 @@ class ConversationStrategy(SettingsStrategy):
             "model": str(conv.meta_data.get("model", "auto")),
         }
 
-    async def update_settings(self, context_id: str, key: str, value: str) -> None:
+    async def update_settings(
+        self, context_id: str, key: str, value: str
+    ) -> Dict[str, str]:
         conv = await self.storage.get_conversation_by_id(context_id)
-        if conv:
-            conv.meta_data[key] = value
-            if key == "provider":
-                conv.meta_data["model"] = self.provider_manager.get_default_model(value)
-            await self.storage.save_conversation(conv)
+        if not conv:
+            return {"provider": "perplexity", "model": "auto"}
+        conv.meta_data[key] = value
+        if key == "provider":
+            conv.meta_data["model"] = self.provider_manager.get_default_model(value)
+        await self.storage.save_conversation(conv)
+        return {
+            "provider": str(conv.meta_data.get("provider", "perplexity")),
+            "model": str(conv.meta_data.get("model", "auto")),
+        }
 
     async def get_available_providers(self, context_id: str) -> List[str]:
         conv = await self.storage.get_conversation_by_id(context_id)
@@ -137,7 +286,9 @@ class UserStrategy(SettingsStrategy):
             "model": str(settings.get("default_model", "auto")),
         }
 
-    async def update_settings(self, context_id: str, key: str, value: str) -> None:
+    async def update_settings(
+        self, context_id: str, key: str, value: str
+    ) -> Dict[str, str]:
         user_id = int(context_id)
         settings = await self.storage.get_user_settings(user_id)
 
@@ -148,6 +299,10 @@ class UserStrategy(SettingsStrategy):
             settings["default_model"] = self.provider_manager.get_default_model(value)
 
         await self.storage.save_user_settings(user_id, settings)
+        return {
+            "provider": str(settings.get("default_provider", "perplexity")),
+            "model": str(settings.get("default_model", "auto")),
+        }
 
     async def get_available_providers(self, context_id: str) -> List[str]:
         return list(self.provider_manager._provider_classes.keys())
@@ -161,86 +316,71 @@ class KeyboardHandler:
         self.provider_manager = provider_manager
         self.state_manager = KeyboardStateManager(storage)
 
-        self.strategies = {
-            "c": ConversationStrategy(storage, provider_manager),
-            "u": UserStrategy(storage, provider_manager),
-        }
+        self._conv_strategy = ConversationStrategy(storage, provider_manager)
+        self._user_strategy = UserStrategy(storage, provider_manager)
+        # prefix -> full conversation id is immutable per conversation, so a
+        # menu interaction burst only needs one DB lookup
+        self._ctx_cache: "OrderedDict[tuple[str, str], tuple[float, str]]" = (
+            OrderedDict()
+        )
+        self._ctx_cache_max = 1024
+        self._ctx_cache_ttl = 60.0
 
-    def _hash_val(self, text: str) -> str:
-        return hashlib.md5(text.encode()).hexdigest()[:8]
+    def _resolve_index(self, token: str, candidates: List[str]) -> Optional[str]:
+        try:
+            idx = int(token)
+        except ValueError:
+            return None
+        return candidates[idx] if 0 <= idx < len(candidates) else None
 
-    def _resolve_val(self, hashed: str, candidates: List[str]) -> Optional[str]:
-        for c in candidates:
-            if self._hash_val(c) == hashed:
-                return c
+    def _strategy(self, scope: str) -> Optional[SettingsStrategy]:
+        # Only two scopes exist; a branch beats a dict lookup per callback
+        if scope == "c":
+            return self._conv_strategy
+        if scope == "u":
+            return self._user_strategy
         return None
 
     async def _resolve_context_id(self, scope: str, short_id: str) -> Optional[str]:
         if scope == "u":
             return short_id
         if scope == "c":
-            return cast(
+            key = (scope, short_id)
+            cached = self._ctx_cache.get(key)
+            now = time.monotonic()
+            if cached and now - cached[0] < self._ctx_cache_ttl:
+                self._ctx_cache.move_to_end(key)
+                return cached[1]
+            full_id = cast(
                 Optional[str],
                 await self.storage.get_conversation_id_by_prefix(short_id),
             )
+            if full_id:
+                self._ctx_cache[key] = (now, full_id)
+                self._ctx_cache.move_to_end(key)
+                if len(self._ctx_cache) > self._ctx_cache_max:
+                    self._ctx_cache.popitem(last=False)
+            return full_id
         return None
 
     def build_root_menu(
         self, scope: str, short_id: str, settings: Dict[str, str]
     ) -> InlineKeyboardMarkup:
-        return InlineKeyboardMarkup(
-            inline_keyboard=[
-                [
-                    InlineKeyboardButton(
-                        text=f"Provider: {settings['provider']}",
-                        callback_data=f"settings:{scope}:nav:{short_id}:prov",
-                    )
-                ],
-                [
-                    InlineKeyboardButton(
-                        text=f"Model: {settings['model']}",
-                        callback_data=f"settings:{scope}:nav:{short_id}:mod",
-                    )
-                ],
-                [
-                    InlineKeyboardButton(
-                        text="< Back",
-                        callback_data=f"settings:{scope}:close:{short_id}",
-                    )
-                ],
-            ]
+        return _build_root_menu_cached(
+            scope, short_id, settings["provider"], settings["model"]
         )
 
     def build_list_menu(
         self, scope: str, short_id: str, items: List[str], category: str
     ) -> InlineKeyboardMarkup:
-        buttons = []
-        for item in items:
-            h = self._hash_val(item)
-            buttons.append(
-                [
-                    InlineKeyboardButton(
-                        text=item,
-                        callback_data=f"settings:{scope}:pick:{short_id}:{category}:{h}",
-                    )
-                ]
-            )
-
-        buttons.append(
-            [
-                InlineKeyboardButton(
-                    text="< Back", callback_data=f"settings:{scope}:nav:{short_id}:root"
-                )
-            ]
-        )
-        return InlineKeyboardMarkup(inline_keyboard=buttons)
+        return _build_list_menu_cached(scope, short_id, tuple(items), category)
 
     def create_settings_button(
         self, conversation_id: str
     ) -> List[InlineKeyboardButton]:
         short_id = conversation_id[:12]
         return [
-            InlineKeyboardButton(
+            InlineKeyboardButton.model_construct(
                 text="Conversation Settings",
                 callback_data=f"settings:c:open:{short_id}",
             )
@@ -253,12 +393,14 @@ class KeyboardHandler:
         if not callback.data or not isinstance(callback.message, Message):
             return
 
-        parts = callback.data.split(":")
+        # Single bounded split; extra carries the optional view/category/hash
+        # fields so malformed data cannot IndexError deeper in the handler
+        parts = callback.data.split(":", 5)
         if len(parts) < 4:
             return
 
-        scope, action, short_id = parts[1], parts[2], parts[3]
-        strategy = self.strategies.get(scope)
+        _, scope, action, short_id, *extra = parts
+        strategy = self._strategy(scope)
         if not strategy:
             return
 
@@ -268,13 +410,19 @@ class KeyboardHandler:
             return
 
         if action == "open":
-            if callback.message.reply_markup:
-                await self.state_manager.save_keyboard_state(
-                    short_id, callback.message.reply_markup
-                )
             settings = await strategy.get_settings(full_id)
             kb = self.build_root_menu(scope, short_id, settings)
-            await callback.message.edit_reply_markup(reply_markup=kb)
+            # The state write and the markup edit touch disk and network
+            # independently; overlap them instead of paying both in series
+            if callback.message.reply_markup:
+                await asyncio.gather(
+                    self.state_manager.save_keyboard_state(
+                        short_id, callback.message.reply_markup
+                    ),
+                    callback.message.edit_reply_markup(reply_markup=kb),
+                )
+            else:
+                await callback.message.edit_reply_markup(reply_markup=kb)
             await callback.answer()
 
         elif action == "close":
@@ -288,7 +436,7 @@ class KeyboardHandler:
                 await callback.answer()
 
         elif action == "nav":
-            view = parts[4]
+            view = extra[0] if extra else None
             if view == "root":
                 settings = await strategy.get_settings(full_id)
                 kb = self.build_root_menu(scope, short_id, settings)
@@ -300,12 +448,18 @@ class KeyboardHandler:
                 current_prov = settings["provider"]
                 items = self.provider_manager.get_available_models(current_prov)
                 kb = self.build_list_menu(scope, short_id, items, "mod")
+            else:
+                await callback.answer()
+                return
 
             await callback.message.edit_reply_markup(reply_markup=kb)
             await callback.answer()
 
         elif action == "pick":
-            category, item_hash = parts[4], parts[5]
+            if len(extra) < 2:
+                await callback.answer("Invalid selection", show_alert=True)
+                return
+            category, item_token = extra[0], extra[1]
 
             candidates = []
             if category == "prov":
@@ -316,20 +470,26 @@ class KeyboardHandler:
                     settings["provider"]
                 )
 
-            value = self._resolve_val(item_hash, candidates)
+            value = self._resolve_index(item_token, candidates)
             if not value:
                 await callback.answer("Invalid selection", show_alert=True)
                 return
 
             key = "provider" if category == "prov" else "model"
-            await strategy.update_settings(full_id, key, value)
-
-            settings = await strategy.get_settings(full_id)
+            # update_settings returns the resulting dict, so the root menu
+            # rebuild skips a second settings read
+            settings = await strategy.update_settings(full_id, key, value)
             kb = self.build_root_menu(scope, short_id, settings)
             await callback.message.edit_reply_markup(reply_markup=kb)
             await callback.answer(f"Set {key} to {value}")
 
 
+def _format_size(size: int) -> str:
+    """Human-readable asset size; divides once and branches on the result"""
+    kb = size / 1024
+    return f"{kb:.1f} KB" if kb < 1024 else f"{kb / 1024:.1f} MB"
+
+
 @operation(name="assets_menu", validate_callback_prefix="assets_menu:")
 @resilient_request(scope="telegram")
 async def handle_assets_menu(
@@ -341,31 +501,34 @@ async def handle_assets_menu(
         return
     page_id = callback.data.split(":")[1]
     assets = await storage.load_assets(page_id)
-    if callback.message.reply_markup:
-        await state_manager.save_keyboard_state(page_id, callback.message.reply_markup)
-
-    buttons = []
-    for asset in assets:
-        size_str = (
-            f"{asset.size/1024:.1f} KB"
-            if asset.size < 1024 * 1024
-            else f"{asset.size/1024/1024:.1f} MB"
-        )
-        buttons.append(
-            [
-                InlineKeyboardButton(
-                    text=f"{asset.file_name} ({size_str})",
-                    callback_data=f"asset_dl:{page_id}:{asset.asset_id}",
-                )
-            ]
-        )
+
+    buttons = [
+        [
+            InlineKeyboardButton.model_construct(
+                text=f"{asset.file_name} ({_format_size(asset.size)})",
+                callback_data=f"asset_dl:{page_id}:{asset.asset_id}",
+            )
+        ]
+        for asset in assets
+    ]
     buttons.append(
-        [InlineKeyboardButton(text="← Back", callback_data=f"assets_back:{page_id}")]
+        [
+            InlineKeyboardButton.model_construct(
+                text="← Back", callback_data=f"assets_back:{page_id}"
+            )
+        ]
     )
 
-    await callback.message.edit_reply_markup(
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons)
+    edit = callback.message.edit_reply_markup(
+        reply_markup=InlineKeyboardMarkup.model_construct(inline_keyboard=buttons)
     )
+    if callback.message.reply_markup:
+        await asyncio.gather(
+            state_manager.save_keyboard_state(page_id, callback.message.reply_markup),
+            edit,
+        )
+    else:
+        await edit
     await callback.answer()
 
 
@@ -382,7 +545,7 @@ async def handle_asset_download(
         await callback.answer("Asset not found", show_alert=True)
         return
     await callback.message.reply_document(
-        document=BufferedInputFile(asset.file_data, asset.file_name),
+        document=BufferedInputFile(await asset.read_data(), asset.file_name),
         caption=f"Code file: {asset.file_name}",
     )
     await callback.answer(f"Sent {asset.file_name}")
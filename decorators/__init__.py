@@ -1,3 +1,15 @@
-from .decorators import operation, resilient_request, db_lock_retry
+from .decorators import (
+    operation,
+    resilient_request,
+    db_lock_retry,
+    cpu_bound,
+    cleanup_rate_limits,
+)
 
-__all__ = ["operation", "resilient_request", "db_lock_retry"]
+__all__ = [
+    "operation",
+    "resilient_request",
+    "db_lock_retry",
+    "cpu_bound",
+    "cleanup_rate_limits",
+]
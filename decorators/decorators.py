@@ -3,10 +3,9 @@ import functools
 import logging
 import time
 import random
-import traceback
 import inspect
-from typing import Callable, Optional, Dict, List, Any, cast
-from collections import defaultdict
+from typing import Callable, Deque, Optional, Dict, Any, cast
+from collections import defaultdict, deque
 from dataclasses import dataclass, field
 
 from aiogram.types import Message, CallbackQuery
@@ -18,7 +17,7 @@ from aiogram.exceptions import (
 )
 from sqlalchemy.exc import OperationalError
 
-from config import Config, logger
+from config import CONFIG, logger
 
 
 @dataclass
@@ -33,43 +32,48 @@ class CircuitBreakerState:
 class RateLimitState:
     last_request_time: float = 0.0
     backoff_until: float = 0.0
-    history: List[float] = field(default_factory=list)
+    # Bounded ring buffer: maxlen eviction is O(1), no slice-copy trimming
+    history: Deque[float] = field(default_factory=lambda: deque(maxlen=20))
     lock: asyncio.Lock = field(default_factory=asyncio.Lock)
 
 
 _CIRCUIT_STATES: Dict[str, CircuitBreakerState] = defaultdict(CircuitBreakerState)
 _RATE_LIMITS: Dict[str, RateLimitState] = defaultdict(RateLimitState)
 
-_SIGNATURE_CACHE: Dict[Callable[..., Any], inspect.Signature] = {}
+# Position of the 'chat_id' parameter per function (-1 when absent); avoids
+# binding a BoundArguments object on every decorated call
+_SIGNATURE_CACHE: Dict[Callable[..., Any], int] = {}
 
 
-def _get_bound_args(
-    func: Callable[..., Any], args: tuple[Any, ...], kwargs: dict[str, Any]
-) -> inspect.BoundArguments:
-    """Bind arguments to parameter names using cached signatures"""
-    if func not in _SIGNATURE_CACHE:
-        _SIGNATURE_CACHE[func] = inspect.signature(func)
-
-    sig = _SIGNATURE_CACHE[func]
-    bound = sig.bind(*args, **kwargs)
-    bound.apply_defaults()
-    return bound
+def _chat_id_index(func: Callable[..., Any]) -> int:
+    """Index of the 'chat_id' parameter, cached; -1 if the function has none"""
+    idx = _SIGNATURE_CACHE.get(func)
+    if idx is None:
+        params = tuple(inspect.signature(func).parameters)
+        idx = params.index("chat_id") if "chat_id" in params else -1
+        _SIGNATURE_CACHE[func] = idx
+    return idx
 
 
 def resilient_request(
     scope: str = "default",
-    max_retries: int = Config.MAX_RETRIES,
+    max_retries: int = CONFIG.MAX_RETRIES,
     use_circuit_breaker: bool = False,
 ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
     """Wraps async operations with circuit breaking, exponential backoff, and automatic rate limiting"""
 
     def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        # Decoration-time constants keep per-call work in the wrapper to a
+        # minimum; this path runs on every inbound update and retry
+        is_telegram = scope == "telegram"
+        rate_key_prefix = f"{scope}:"
+
         @functools.wraps(func)
         async def wrapper(*args: Any, **kwargs: Any) -> Any:
             if use_circuit_breaker:
                 cb_state = _CIRCUIT_STATES[scope]
                 if cb_state.is_open:
-                    if time.time() < cb_state.next_attempt_allowed:
+                    if time.monotonic() < cb_state.next_attempt_allowed:
                         logger.warning(f"Circuit '{scope}' open. Blocking request.")
                         raise RuntimeError(
                             f"Service {scope} is temporarily unavailable."
@@ -82,11 +86,16 @@ def resilient_request(
 
             chat_id = None
             try:
-                bound_args = _get_bound_args(func, args, kwargs)
-                chat_id = bound_args.arguments.get("chat_id")
+                idx = _chat_id_index(func)
+                if idx >= 0:
+                    chat_id = kwargs.get("chat_id")
+                    if chat_id is None and idx < len(args):
+                        chat_id = args[idx]
 
                 if not chat_id:
-                    for arg in args:
+                    # The update object is always the first arg (or second,
+                    # after self on methods); no need to scan the full tuple
+                    for arg in args[:2]:
                         if isinstance(arg, Message):
                             chat_id = arg.chat.id
                             break
@@ -97,11 +106,11 @@ def resilient_request(
             except Exception:
                 pass
 
-            if chat_id and scope == "telegram":
-                await _enforce_rate_limit(f"{scope}:{chat_id}")
+            if chat_id and is_telegram:
+                await _enforce_rate_limit(rate_key_prefix + str(chat_id))
 
             retry_count = 0
-            backoff = Config.INITIAL_RETRY_DELAY
+            backoff = CONFIG.INITIAL_RETRY_DELAY
 
             while True:
                 try:
@@ -117,7 +126,7 @@ def resilient_request(
                     logger.warning(f"Telegram Rate Limit: Waiting {wait_time}s")
 
                     if chat_id:
-                        await _apply_backoff(f"{scope}:{chat_id}", wait_time)
+                        await _apply_backoff(rate_key_prefix + str(chat_id), wait_time)
 
                     await asyncio.sleep(wait_time)
                     continue
@@ -161,10 +170,18 @@ def operation(
     def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
         @functools.wraps(func)
         async def wrapper(*args: Any, **kwargs: Any) -> Any:
-            start_time = time.time()
-
-            msg = next((arg for arg in args if isinstance(arg, Message)), None)
-            cb = next((arg for arg in args if isinstance(arg, CallbackQuery)), None)
+            start_time = time.monotonic()
+
+            # Update object is the first arg (or second, after self); avoids
+            # two generator scans over the whole args tuple per call
+            msg = cb = None
+            for arg in args[:2]:
+                if isinstance(arg, Message):
+                    msg = arg
+                    break
+                if isinstance(arg, CallbackQuery):
+                    cb = arg
+                    break
 
             user_id = None
 
@@ -182,9 +199,9 @@ def operation(
                 return await func(*args, **kwargs)
 
             except Exception as e:
-                elapsed = time.time() - start_time
-                logger.error(
-                    f"[{name}] CRASH after {elapsed:.2f}s [User:{user_id}]: {e}\n{traceback.format_exc()}"
+                elapsed = time.monotonic() - start_time
+                logger.exception(
+                    "[%s] CRASH after %.2fs [User:%s]: %s", name, elapsed, user_id, e
                 )
 
                 if notify_user:
@@ -208,11 +225,15 @@ def operation(
 
 
 def db_lock_retry(func: Callable[..., Any]) -> Callable[..., Any]:
-    """Wraps async DB calls with retries for database lock errors (sqlite+aiosqlite)"""
+    """Wraps async DB calls with retries for database lock errors (sqlite+aiosqlite).
+
+    With WAL and busy_timeout in place SQLite waits out lock contention in C,
+    so a single Python-level retry is kept only as a last-resort backstop.
+    """
 
     @functools.wraps(func)
     async def wrapper(*args: Any, **kwargs: Any) -> Any:
-        max_db_retries = 5
+        max_db_retries = 2
         retry_count = 0
 
         while retry_count < max_db_retries:
@@ -259,48 +280,74 @@ async def _enforce_rate_limit(key: str) -> None:
     """Pauses execution to enforce minimum request intervals and active backoff penalties"""
     state = _RATE_LIMITS[key]
 
+    # Lock-free fast path: no active backoff and too few samples for the
+    # rolling average means there is nothing to wait for. The deque append
+    # is atomic under the GIL, so skipping the lock here is safe.
+    now = time.monotonic()
+    if now >= state.backoff_until and len(state.history) < 2:
+        state.last_request_time = now
+        state.history.append(now)
+        return
+
     async with state.lock:
-        now = time.time()
+        now = time.monotonic()
 
         if now < state.backoff_until:
             wait_time = state.backoff_until - now
             if wait_time > 0.05:
                 await asyncio.sleep(wait_time)
-            now = time.time()
 
         if len(state.history) >= 2:
-            recent_window = state.history[-5:]
-            if len(recent_window) > 1:
-                avg_interval = (recent_window[-1] - recent_window[0]) / (
-                    len(recent_window) - 1
-                )
+            window = min(len(state.history), 5)
+            avg_interval = (state.history[-1] - state.history[-window]) / (window - 1)
 
-                if avg_interval < Config.MIN_UPDATE_INTERVAL:
-                    penalty = Config.MIN_UPDATE_INTERVAL - avg_interval
-                    await asyncio.sleep(penalty)
+            if avg_interval < CONFIG.MIN_UPDATE_INTERVAL:
+                penalty = CONFIG.MIN_UPDATE_INTERVAL - avg_interval
+                await asyncio.sleep(penalty)
 
-        new_now = time.time()
+        new_now = time.monotonic()
         state.last_request_time = new_now
         state.history.append(new_now)
 
-        if len(state.history) > 20:
-            state.history = state.history[-20:]
-
 
 async def _apply_backoff(key: str, seconds: float) -> None:
     """Apply penalty to a rate limit bucket"""
     state = _RATE_LIMITS[key]
     async with state.lock:
-        state.backoff_until = time.time() + seconds
+        state.backoff_until = time.monotonic() + seconds
+
+
+async def cleanup_rate_limits(
+    interval: float = 300.0, max_idle: float = 600.0
+) -> None:
+    """Periodically evict idle rate-limit buckets.
+
+    _RATE_LIMITS grows by one entry per unique chat forever; chats that went
+    quiet keep their state (and lock) alive. Run as a background task from
+    the entrypoint to bound steady-state memory.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        cutoff = time.monotonic() - max_idle
+        stale = [
+            key
+            for key, state in _RATE_LIMITS.items()
+            if not state.history or state.history[-1] < cutoff
+        ]
+        for key in stale:
+            del _RATE_LIMITS[key]
+        if stale:
+            logger.debug(f"Evicted {len(stale)} idle rate-limit buckets")
 
 
 def _record_circuit_failure(scope: str) -> None:
     """Trip circuit breaker if needed"""
     state = _CIRCUIT_STATES[scope]
+    now = time.monotonic()
     state.failure_count += 1
-    state.last_failure_time = time.time()
+    state.last_failure_time = now
 
     if state.failure_count >= 3:
         state.is_open = True
-        state.next_attempt_allowed = time.time() + 60
+        state.next_attempt_allowed = now + 60
         logger.error(f"Circuit '{scope}' tripped. Pausing requests for 60s.")
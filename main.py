@@ -1,10 +1,10 @@
-from config import Config, logger
+from config import CONFIG, logger
 from storage import DatabaseManager
 from providers import ProviderManager
 from utils import MessageFormatter, WebServer
+from decorators import cleanup_rate_limits
 from core import (
     BotController,
-    KeyboardStateManager,
     handle_assets_menu,
     handle_asset_download,
     handle_assets_back,
@@ -12,7 +12,6 @@ from core import (
 
 import sys
 import asyncio
-import traceback
 from aiogram import Bot, Dispatcher, Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.storage.memory import MemoryStorage
@@ -22,20 +21,24 @@ from aiogram.client.default import DefaultBotProperties
 async def main() -> None:
     """Main entry point"""
     try:
-        storage = DatabaseManager(Config.DATABASE_PATH)
+        CONFIG.validate()
+
+        storage = DatabaseManager(CONFIG.DATABASE_PATH)
+        # Schema must exist before any handler can touch the DB
+        await storage.init()
 
         provider_manager = ProviderManager(storage)
 
         # Auto-load and configure all providers found in the registry
-        provider_manager.load_providers(Config)
+        provider_manager.load_providers(CONFIG)
 
         formatter = MessageFormatter()
         web_server = WebServer(
-            storage=storage, host=Config.WEB_HOST, port=Config.WEB_PORT
+            storage=storage, host=CONFIG.WEB_HOST, port=CONFIG.WEB_PORT
         )
         await web_server.start()
 
-        bot = Bot(token=Config.BOT_TOKEN, default=DefaultBotProperties(parse_mode=None))
+        bot = Bot(token=CONFIG.BOT_TOKEN, default=DefaultBotProperties(parse_mode=None))
 
         controller = BotController(
             bot=bot,
@@ -48,6 +51,10 @@ async def main() -> None:
         dp = Dispatcher(storage=MemoryStorage())
         router = Router()
 
+        # One shared state manager for the asset handlers; reuse the instance
+        # the controller's keyboard handler already holds
+        state_manager = controller.keyboard_handler.state_manager
+
         # Message Handlers
         @router.message(F.text)
         async def message_handler(message: Message) -> None:
@@ -64,7 +71,6 @@ async def main() -> None:
         # Asset Handlers
         @router.callback_query(F.data.startswith("assets_menu:"))
         async def assets_menu_handler(callback: CallbackQuery) -> None:
-            state_manager = KeyboardStateManager(storage)
             await handle_assets_menu(callback, storage, state_manager)
 
         @router.callback_query(F.data.startswith("asset_dl:"))
@@ -73,7 +79,6 @@ async def main() -> None:
 
         @router.callback_query(F.data.startswith("assets_back:"))
         async def assets_back_handler(callback: CallbackQuery) -> None:
-            state_manager = KeyboardStateManager(storage)
             await handle_assets_back(callback, storage, state_manager)
 
         # Unified Settings Handler
@@ -83,15 +88,21 @@ async def main() -> None:
 
         dp.include_router(router)
 
+        # Background eviction of idle per-chat rate-limit state
+        cleanup_task = asyncio.create_task(cleanup_rate_limits())
+
         logger.info("Bot started successfully")
         logger.info(
             f"Registered providers: {list(provider_manager._provider_classes.keys())}"
         )
 
-        await dp.start_polling(bot)
+        try:
+            await dp.start_polling(bot)
+        finally:
+            cleanup_task.cancel()
 
     except Exception as e:
-        logger.error(f"Fatal error: {e}\n{traceback.format_exc()}")
+        logger.exception("Fatal error: %s", e)
         sys.exit(1)
 
 
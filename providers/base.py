@@ -1,24 +1,30 @@
+import sys
+
 from storage import ProviderType, ProviderCapability, Conversation, DatabaseManager
 from config import logger
 from typing import (
     AsyncIterator,
     List,
     Protocol,
-    runtime_checkable,
     Optional,
-    TypedDict,
+    Sequence,
     Dict,
     Type,
     Any,
 )
 from abc import ABC, abstractmethod, ABCMeta
+from dataclasses import dataclass
 from aiogram.types import InlineKeyboardButton
 
 
-class AttachmentInput(TypedDict):
+@dataclass(frozen=True, slots=True)
+class AttachmentInput:
     """
     Provider-agnostic attachment description.
 
+    Slot attributes instead of a TypedDict: hot paths read these fields
+    several times per attachment and attribute access skips dict hashing.
+
     filename:     original file name (for display / MIME inference)
     content_type: MIME type (e.g. 'image/png', 'application/pdf')
     data:         raw bytes of the file
@@ -49,6 +55,9 @@ class LLMProviderMeta(ABCMeta):
         provider_name = namespace.get("PROVIDER_NAME")
 
         if provider_name:
+            # Interned so registry lookups by user-supplied names hit the
+            # pointer-equality fast path inside dict key comparison
+            provider_name = sys.intern(provider_name)
             if provider_name in mcs.registry:
                 logger.warning(
                     f"Duplicate provider name detected: {provider_name}. Overwriting."
@@ -62,13 +71,15 @@ class LLMProviderMeta(ABCMeta):
         return cls
 
 
-@runtime_checkable
 class LLMProvider(Protocol):
-    """Protocol defining LLM provider interface"""
+    """Protocol defining LLM provider interface (static typing only).
 
-    @property
-    def provider_type(self) -> ProviderType:
-        ...
+    Not runtime-checkable: nothing isinstance-checks against it, and
+    _ProtocolMeta.__instancecheck__ is far slower than the C-level check
+    against BaseLLMProvider, which is what runtime code should use.
+    """
+
+    provider_type: ProviderType
 
     @property
     def capabilities(self) -> List[ProviderCapability]:
@@ -87,7 +98,7 @@ class LLMProvider(Protocol):
     ) -> List[InlineKeyboardButton]:
         ...
 
-    def get_available_models(self) -> List[str]:
+    def get_available_models(self) -> Sequence[str]:
         ...
 
 
@@ -108,10 +119,9 @@ class BaseLLMProvider(metaclass=LLMProviderMeta):
         """
         pass
 
-    @property
-    @abstractmethod
-    def provider_type(self) -> ProviderType:
-        pass
+    # Class attribute so callers (e.g. the provider menu) can read it off the
+    # class without constructing HTTP clients
+    provider_type: ProviderType
 
     @property
     def capabilities(self) -> List[ProviderCapability]:
@@ -133,6 +143,6 @@ class BaseLLMProvider(metaclass=LLMProviderMeta):
         return []
 
     @abstractmethod
-    def get_available_models(self) -> List[str]:
-        """Return list of available models for this provider"""
+    def get_available_models(self) -> Sequence[str]:
+        """Return the available models for this provider"""
         pass
@@ -1,6 +1,12 @@
 from .openai_compatible import OpenAICompatibleProvider
 from storage import DatabaseManager
-from typing import List, Optional, Any, Dict
+
+import re
+from typing import Optional, Any, Dict, Sequence
+
+# One-pass validation of the key shape ('gsk_' + 52 alphanumerics); also
+# rejects placeholder values like 'none' without extra lowercase scans
+_GROQ_KEY_RE = re.compile(r"gsk_[A-Za-z0-9]{52}")
 
 
 class GroqProvider(OpenAICompatibleProvider):
@@ -8,7 +14,8 @@ class GroqProvider(OpenAICompatibleProvider):
 
     PROVIDER_NAME = "groq"
 
-    AVAILABLE_MODELS = [
+    # Immutable: returned directly without a defensive copy
+    AVAILABLE_MODELS = (
         "llama-3.1-8b-instant",
         "llama-3.3-70b-versatile",
         "meta-llama/llama-guard-4-12b",
@@ -21,7 +28,7 @@ class GroqProvider(OpenAICompatibleProvider):
         "moonshotai/kimi-k2-instruct-0905",
         "openai/gpt-oss-safeguard-20b",
         "qwen/qwen3-32b",
-    ]
+    )
 
     def __init__(
         self, storage: DatabaseManager, api_key: str, model: Optional[str] = None
@@ -37,20 +44,12 @@ class GroqProvider(OpenAICompatibleProvider):
     @classmethod
     def create_config(cls, config: Any) -> Optional[Dict[str, Any]]:
         raw_key = config.GROQ_API_KEY
-        if not raw_key:
-            return None
-        key = str(raw_key).strip()
-        if (
-            not key
-            or key.lower() == "none"
-            or not key.startswith("gsk_")
-            or len(key) != 56
-        ):
+        if not raw_key or not _GROQ_KEY_RE.fullmatch(str(raw_key).strip()):
             return None
         return {
             "api_key": config.GROQ_API_KEY,
             "model": config.GROQ_MODEL or "llama-3.3-70b-versatile",
         }
 
-    def get_available_models(self) -> List[str]:
-        return self.AVAILABLE_MODELS.copy()
+    def get_available_models(self) -> Sequence[str]:
+        return self.AVAILABLE_MODELS
@@ -10,13 +10,21 @@ from config import logger
 from decorators import resilient_request
 
 import base64
-from typing import AsyncIterator, Optional, List, Dict, Any, cast
+from typing import AsyncIterator, Optional, List, Dict, Any, Sequence, cast
 from openai import AsyncOpenAI, APIError
 
+# Role translation done via one dict lookup per message instead of two
+# enum comparisons; anything unknown is an assistant turn
+_ROLE_MAP = {MessageRole.USER: "user", MessageRole.SYSTEM: "system"}
+
 
 class OpenAICompatibleProvider(BaseLLMProvider):
     """Generic provider for APIs compatible with the OpenAI SDK"""
 
+    # Cap for inlined text attachments; decoding a multi-MB file into the
+    # prompt would blow up peak memory and the request payload alike
+    MAX_SNIPPET_BYTES = 32 * 1024
+
     def __init__(
         self,
         storage: DatabaseManager,
@@ -32,13 +40,17 @@ class OpenAICompatibleProvider(BaseLLMProvider):
         self.default_system_prompt = default_system_prompt
 
         self.client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+        # Constant call kwargs built once; splatting a prebuilt dict is
+        # cheaper than re-materializing keyword literals per request
+        self._default_create_kwargs: Dict[str, Any] = {
+            "stream": True,
+            "temperature": 0.6,
+        }
         logger.info(
             f"OpenAI Compatible provider initialized (URL: {base_url}, Model: {model})"
         )
 
-    @property
-    def provider_type(self) -> ProviderType:
-        return ProviderType.CLIENT_HISTORY
+    provider_type = ProviderType.CLIENT_HISTORY
 
     @property
     def capabilities(self) -> List[ProviderCapability]:
@@ -47,70 +59,81 @@ class OpenAICompatibleProvider(BaseLLMProvider):
             ProviderCapability.ACCEPTS_IMAGES,
         ]
 
-    def get_available_models(self) -> List[str]:
+    def get_available_models(self) -> Sequence[str]:
         return [self.model]
 
-    def _encode_image(self, image_data: bytes) -> str:
-        return base64.b64encode(image_data).decode("utf-8")
+    def _image_data_url(self, content_type: str, image_data: bytes) -> str:
+        """Build a data: URL with one decode instead of two full-size copies"""
+        return (
+            b"data:%b;base64,%b" % (content_type.encode(), base64.b64encode(image_data))
+        ).decode("ascii")
 
     def _prepare_messages(
         self, conversation: Conversation, attachments: Optional[List[AttachmentInput]]
     ) -> List[Dict[str, Any]]:
-        messages: List[Dict[str, Any]] = []
+        role_for = _ROLE_MAP.get
+        messages: List[Dict[str, Any]] = [
+            {"role": role_for(msg.role, "assistant"), "content": msg.content}
+            for msg in conversation.messages
+        ]
 
-        if (
-            not conversation.messages
-            or conversation.messages[0].role != MessageRole.SYSTEM
+        # Identity compare on the enum member; cheaper than building the dict
+        # list first and string-comparing its head
+        if not (
+            conversation.messages
+            and conversation.messages[0].role is MessageRole.SYSTEM
         ):
-            messages.append({"role": "system", "content": self.default_system_prompt})
-
-        for msg in conversation.messages:
-            role = "user" if msg.role == MessageRole.USER else "assistant"
-            if msg.role == MessageRole.SYSTEM:
-                role = "system"
-
-            messages.append({"role": role, "content": msg.content})
-
-        if attachments:
-            last_msg = messages[-1]
-            if last_msg["role"] != "user":
-                messages.append({"role": "user", "content": []})
-                last_msg = messages[-1]
-
-            # Ensure content is a list for mixed content
-            if isinstance(last_msg["content"], str):
-                last_msg["content"] = [{"type": "text", "text": last_msg["content"]}]
-            elif not isinstance(last_msg["content"], list):
-                last_msg["content"] = []
-
-            content_list = cast(List[Dict[str, Any]], last_msg["content"])
-
-            for att in attachments:
-                if att["content_type"].startswith("image/"):
-                    b64_img = self._encode_image(att["data"])
-                    content_list.append(
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:{att['content_type']};base64,{b64_img}"
-                            },
-                        }
+            messages.insert(
+                0, {"role": "system", "content": self.default_system_prompt}
+            )
+
+        # Hot path: plain text turns skip the attachment machinery entirely
+        if not attachments:
+            return messages
+
+        last_msg = messages[-1]
+        if last_msg["role"] != "user":
+            last_msg = {"role": "user", "content": []}
+            messages.append(last_msg)
+
+        # Build the mixed-content list locally and assign it back once
+        content = last_msg["content"]
+        if isinstance(content, str):
+            content_list: List[Dict[str, Any]] = [{"type": "text", "text": content}]
+        elif isinstance(content, list):
+            content_list = cast(List[Dict[str, Any]], content)
+        else:
+            content_list = []
+
+        for att in attachments:
+            if att.content_type.startswith("image/"):
+                content_list.append(
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": self._image_data_url(att.content_type, att.data)
+                        },
+                    }
+                )
+            else:
+                try:
+                    text_content = att.data[: self.MAX_SNIPPET_BYTES].decode(
+                        "utf-8", errors="ignore"
                     )
-                else:
-                    try:
-                        text_content = att["data"].decode("utf-8", errors="ignore")
-                        snippet = f"\n\n[Attached File: {att['filename']}]\n```\n{text_content}\n```"
-
-                        found_text = False
-                        for item in content_list:
-                            if item.get("type") == "text":
-                                item["text"] = str(item.get("text", "")) + snippet
-                                found_text = True
-                                break
-                        if not found_text:
-                            content_list.append({"type": "text", "text": snippet})
-                    except Exception:
-                        pass
+                    snippet = f"\n\n[Attached File: {att.filename}]\n```\n{text_content}\n```"
+
+                    found_text = False
+                    for item in content_list:
+                        if item.get("type") == "text":
+                            item["text"] = str(item.get("text", "")) + snippet
+                            found_text = True
+                            break
+                    if not found_text:
+                        content_list.append({"type": "text", "text": snippet})
+                except Exception:
+                    pass
+
+        last_msg["content"] = content_list
 
         return messages
 
@@ -119,7 +142,7 @@ class OpenAICompatibleProvider(BaseLLMProvider):
         self, messages: List[Dict[str, Any]], model: str
     ) -> Any:
         return await self.client.chat.completions.create(
-            model=model, messages=cast(Any, messages), stream=True, temperature=0.6
+            model=model, messages=messages, **self._default_create_kwargs
         )
 
     async def generate_response(
@@ -129,12 +152,10 @@ class OpenAICompatibleProvider(BaseLLMProvider):
         attachments: Optional[List[AttachmentInput]] = None,
     ) -> AsyncIterator[str]:
 
-        model = self.model
-        if (
-            conversation.meta_data.get("model")
-            and conversation.meta_data.get("model") != "auto"
-        ):
-            model = cast(str, conversation.meta_data.get("model"))
+        meta_model = conversation.meta_data.get("model")
+        model = (
+            cast(str, meta_model) if meta_model and meta_model != "auto" else self.model
+        )
 
         messages = self._prepare_messages(conversation, attachments)
 
@@ -1,16 +1,46 @@
 from .base import BaseLLMProvider, AttachmentInput
+from collections import namedtuple
 from storage import DatabaseManager, ProviderType, Conversation, ProviderCapability
 from config import logger
 from decorators import resilient_request
 import asyncio
-import json
+import orjson
+import random
+import time
 import uuid
 from typing import AsyncIterator, Optional, Dict, List, Any, Union, cast
+import re
+from functools import lru_cache
 from urllib.parse import unquote
 from curl_cffi.requests import AsyncSession
 from curl_cffi import CurlMime
 from aiogram.types import InlineKeyboardButton
 
+# One pass over the cookie header instead of a split/strip loop per pair
+_COOKIE_RE = re.compile(r"\s*([^=;]+)=([^;]*)\s*(?:;|$)")
+
+
+def _fast_uuid4() -> str:
+    """Canonical UUID4 string from the PRNG instead of os.urandom.
+
+    These ids (request/frontend/file) only need uniqueness per request,
+    not cryptographic quality, so skipping the urandom syscall is safe.
+    """
+    return str(uuid.UUID(int=random.getrandbits(128), version=4))
+
+
+@lru_cache(maxsize=8)
+def _parse_cookies_cached(cookies_str: str) -> Dict[str, str]:
+    """Parse a raw cookie header once per distinct string.
+
+    Instances are rebuilt per model by the manager with the same cookie
+    string, so the parse is memoized on the raw value.
+    """
+    return {
+        unquote(key.strip()): unquote(value.strip())
+        for key, value in _COOKIE_RE.findall(cookies_str)
+    }
+
 
 class PerplexityProvider(BaseLLMProvider):
     """Perplexity LLM provider"""
@@ -31,21 +61,31 @@ class PerplexityProvider(BaseLLMProvider):
         "o3-mini-reasoning",
     ]
 
+    _ModelConfig = namedtuple("_ModelConfig", ("mode", "model_preference"))
+
     MODEL_CONFIG = {
-        "auto": {"mode": "concise", "model_preference": "turbo"},
-        "sonar": {"mode": "copilot", "model_preference": "experimental"},
-        "research": {"mode": "copilot", "model_preference": "pplx_alpha"},
-        "gpt-5.1": {"mode": "copilot", "model_preference": "gpt51"},
-        "gpt-5.1-reasoning": {"mode": "copilot", "model_preference": "gpt51_thinking"},
-        "claude-4.5-sonnet": {"mode": "copilot", "model_preference": "claude45sonnet"},
-        "claude-4.5-sonnet-reasoning": {
-            "mode": "copilot",
-            "model_preference": "claude45sonnetthinking",
-        },
-        "gemini-2.5-pro": {"mode": "copilot", "model_preference": "gemini25pro"},
-        "grok-4": {"mode": "copilot", "model_preference": "grok4nonthinking"},
-        "grok-4-reasoning": {"mode": "copilot", "model_preference": "grok4"},
-        "o3-mini-reasoning": {"mode": "copilot", "model_preference": "o3mini"},
+        "auto": _ModelConfig("concise", "turbo"),
+        "sonar": _ModelConfig("copilot", "experimental"),
+        "research": _ModelConfig("copilot", "pplx_alpha"),
+        "gpt-5.1": _ModelConfig("copilot", "gpt51"),
+        "gpt-5.1-reasoning": _ModelConfig("copilot", "gpt51_thinking"),
+        "claude-4.5-sonnet": _ModelConfig("copilot", "claude45sonnet"),
+        "claude-4.5-sonnet-reasoning": _ModelConfig(
+            "copilot", "claude45sonnetthinking"
+        ),
+        "gemini-2.5-pro": _ModelConfig("copilot", "gemini25pro"),
+        "grok-4": _ModelConfig("copilot", "grok4nonthinking"),
+        "grok-4-reasoning": _ModelConfig("copilot", "grok4"),
+        "o3-mini-reasoning": _ModelConfig("copilot", "o3mini"),
+    }
+
+    # Constant request parameters; merged into per-request params so the
+    # deep literal is not rebuilt from scratch every call
+    _PARAMS_TEMPLATE = {
+        "language": "en-US",
+        "source": "default",
+        "search_focus": "internet",
+        "sources": ["web"],
     }
 
     def __init__(
@@ -53,8 +93,15 @@ class PerplexityProvider(BaseLLMProvider):
     ):
         super().__init__(storage)
         self.model = model or "auto"
+        # self.model is fixed for this instance; resolve its request config once
+        self._model_config = self.MODEL_CONFIG.get(
+            self.model, self.MODEL_CONFIG["auto"]
+        )
         self.cookies_dict = self._parse_cookies(cookies)
         self.session: Optional[AsyncSession] = None
+        # Lazily created and reused across uploads; a fresh session per file
+        # would pay TLS-context setup and DNS for every attachment
+        self._s3_session: Optional[AsyncSession] = None
         self._init_session()
         logger.info(f"Perplexity provider initialized (model: {self.model})")
 
@@ -68,9 +115,7 @@ class PerplexityProvider(BaseLLMProvider):
             else None
         )
 
-    @property
-    def provider_type(self) -> ProviderType:
-        return ProviderType.SERVER_HISTORY
+    provider_type = ProviderType.SERVER_HISTORY
 
     @property
     def capabilities(self) -> List[ProviderCapability]:
@@ -83,18 +128,9 @@ class PerplexityProvider(BaseLLMProvider):
     def get_available_models(self) -> List[str]:
         return self.AVAILABLE_MODELS.copy()
 
-    def _parse_cookies(self, cookies_str: str) -> Dict[str, str]:
-        cookies_dict = {}
-        if ";" in cookies_str:
-            pairs = cookies_str.split(";")
-        else:
-            pairs = [cookies_str]
-        for pair in pairs:
-            pair = pair.strip()
-            if "=" in pair:
-                key, value = pair.split("=", 1)
-                cookies_dict[unquote(key.strip())] = unquote(value.strip())
-        return cookies_dict
+    @staticmethod
+    def _parse_cookies(cookies_str: str) -> Dict[str, str]:
+        return _parse_cookies_cached(cookies_str)
 
     def _init_session(self) -> None:
         self.session = AsyncSession(
@@ -121,7 +157,7 @@ class PerplexityProvider(BaseLLMProvider):
                 "accept": "text/event-stream",
                 "content-type": "application/json",
                 "x-perplexity-request-reason": "perplexity-query-state-provider",
-                "x-request-id": str(uuid.uuid4()),
+                "x-request-id": _fast_uuid4(),
             },
             json=json_data,
             stream=True,
@@ -140,8 +176,6 @@ class PerplexityProvider(BaseLLMProvider):
         query = conversation.messages[-1].content
         last_backend_uuid = conversation.meta_data.get("perplexity_thread_id")
 
-        model_config = self.MODEL_CONFIG.get(self.model, self.MODEL_CONFIG["auto"])
-
         attachment_urls = []
         if attachments:
             try:
@@ -153,16 +187,13 @@ class PerplexityProvider(BaseLLMProvider):
         json_data = {
             "query_str": query,
             "params": {
+                **self._PARAMS_TEMPLATE,
                 "attachments": attachment_urls,
-                "language": "en-US",
-                "mode": model_config["mode"],
-                "model_preference": model_config["model_preference"],
-                "frontend_uuid": str(uuid.uuid4()),
-                "frontend_context_uuid": str(uuid.uuid4()),
+                "mode": self._model_config.mode,
+                "model_preference": self._model_config.model_preference,
+                "frontend_uuid": _fast_uuid4(),
+                "frontend_context_uuid": _fast_uuid4(),
                 "last_backend_uuid": last_backend_uuid,
-                "source": "default",
-                "search_focus": "internet",
-                "sources": ["web"],
             },
         }
 
@@ -170,21 +201,41 @@ class PerplexityProvider(BaseLLMProvider):
 
         has_yielded = False
 
+        # Coalesce tiny SSE token chunks before yielding: each yield wakes the
+        # consumer coroutine, so batching to ~256 bytes / 20ms cuts event-loop
+        # churn without visibly changing streaming latency
+        pending: List[str] = []
+        pending_len = 0
+        last_flush = time.monotonic()
+
         try:
             resp = await self._establish_connection(ask_url, json_data)
             chunk_offset = 0
 
-            async for line in resp.aiter_lines():
-                line = line.decode("utf-8", errors="ignore").strip()
+            # Bytes-level scanner: split SSE lines out of a growing buffer and
+            # hand the payload straight to orjson, avoiding a per-line UTF-8
+            # decode/strip/str-slice round trip on fast token streams
+            buf = bytearray()
+            ended = False
+
+            async for raw in resp.aiter_content():
+                buf += raw
 
-                if not line:
-                    continue
+                while not ended:
+                    nl = buf.find(b"\n")
+                    if nl < 0:
+                        break
+                    line = bytes(buf[:nl]).strip()
+                    del buf[: nl + 1]
 
-                if line.startswith("data: "):
-                    json_str = line[6:]
+                    if not line:
+                        continue
 
-                    try:
-                        data = json.loads(json_str)
+                    if line.startswith(b"data: "):
+                        try:
+                            data = orjson.loads(line[6:])
+                        except orjson.JSONDecodeError:
+                            continue
 
                         if (
                             "backend_uuid" in data
@@ -209,15 +260,27 @@ class PerplexityProvider(BaseLLMProvider):
                                     if current_offset >= chunk_offset:
                                         for text_chunk in chunks:
                                             has_yielded = True
-                                            yield text_chunk
+                                            pending.append(text_chunk)
+                                            pending_len += len(text_chunk)
                                         chunk_offset = current_offset + len(chunks)
 
-                    except json.JSONDecodeError:
-                        continue
+                    elif b"end_of_stream" in line:
+                        ended = True
+
+                now = time.monotonic()
+                if pending and (pending_len > 256 or now - last_flush > 0.02):
+                    yield "".join(pending)
+                    pending.clear()
+                    pending_len = 0
+                    last_flush = now
 
-                elif "end_of_stream" in line:
+                if ended:
                     break
 
+            if pending:
+                yield "".join(pending)
+                pending.clear()
+
             if not has_yielded:
                 yield "No response received (Stream ended empty)"
 
@@ -236,21 +299,20 @@ class PerplexityProvider(BaseLLMProvider):
             yield f"Connection error: {err_msg}"
 
     @resilient_request(scope="perplexity_upload", max_retries=2)
-    async def _upload_attachments(self, attachments: List[Dict[str, Any]]) -> List[str]:
-        """Async upload of all attachments"""
-        uploaded_urls = []
-        for att in attachments:
-            ticket = await self._create_upload_ticket(
-                str(att["filename"]), str(att["content_type"]), len(att["data"])
-            )
-            await self._upload_to_s3(
-                ticket,
-                str(att["filename"]),
-                str(att["content_type"]),
-                att["data"],  # bytes
-            )
-            uploaded_urls.append(cast(str, ticket["s3_object_url"]))
-        return uploaded_urls
+    async def _upload_attachments(
+        self, attachments: List[AttachmentInput]
+    ) -> List[str]:
+        """Upload all attachments concurrently, preserving order"""
+        return list(
+            await asyncio.gather(*(self._upload_one(att) for att in attachments))
+        )
+
+    async def _upload_one(self, att: AttachmentInput) -> str:
+        ticket = await self._create_upload_ticket(
+            att.filename, att.content_type, len(att.data)
+        )
+        await self._upload_to_s3(ticket, att.filename, att.content_type, att.data)
+        return cast(str, ticket["s3_object_url"])
 
     async def _create_upload_ticket(
         self, filename: str, content_type: str, file_size: int
@@ -258,7 +320,7 @@ class PerplexityProvider(BaseLLMProvider):
         """Async ticket creation"""
         if self.session is None:
             raise RuntimeError("Session not initialized")
-        file_id = str(uuid.uuid4())
+        file_id = _fast_uuid4()
         url = "https://www.perplexity.ai/rest/uploads/batch_create_upload_urls?version=2.18&source=default"
         body = {
             "files": {
@@ -275,34 +337,39 @@ class PerplexityProvider(BaseLLMProvider):
         if not resp.ok:
             raise RuntimeError(f"Ticket failed: {resp.status_code}")
 
-        data = resp.json()
+        data = orjson.loads(resp.content)
         result = data["results"][file_id]
         if result.get("error"):
             raise RuntimeError(result["error"])
 
         return cast(Dict[str, Any], result)
 
+    def _get_s3_session(self) -> AsyncSession:
+        if self._s3_session is None:
+            self._s3_session = AsyncSession(verify=False)
+        return self._s3_session
+
     async def _upload_to_s3(
         self, ticket: Dict[str, Any], filename: str, content_type: str, data: bytes
     ) -> None:
-        """Async S3 upload using temporary session"""
-        async with AsyncSession(verify=False) as s3_session:
-            mp = CurlMime()
+        """Async S3 upload over the pooled session"""
+        s3_session = self._get_s3_session()
+        mp = CurlMime()
 
-            fields = ticket.get("fields", {})
-            for k, v in fields.items():
-                if v is not None:
-                    mp.addpart(name=str(k), data=str(v).encode("utf-8"))
+        fields = ticket.get("fields", {})
+        for k, v in fields.items():
+            if v is not None:
+                mp.addpart(name=str(k), data=str(v).encode("utf-8"))
 
-            mp.addpart(
-                name="file", filename=filename, content_type=content_type, data=data
-            )
+        mp.addpart(
+            name="file", filename=filename, content_type=content_type, data=data
+        )
 
-            bucket_url = cast(str, ticket["s3_bucket_url"])
-            resp = await s3_session.post(bucket_url, multipart=mp, timeout=60)
+        bucket_url = cast(str, ticket["s3_bucket_url"])
+        resp = await s3_session.post(bucket_url, multipart=mp, timeout=60)
 
-            if not (200 <= resp.status_code < 300):
-                raise RuntimeError(f"S3 upload failed: {resp.status_code} {resp.text}")
+        if not (200 <= resp.status_code < 300):
+            raise RuntimeError(f"S3 upload failed: {resp.status_code} {resp.text}")
 
     def create_extra_buttons(
         self, conversation: Conversation
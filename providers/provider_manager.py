@@ -1,7 +1,9 @@
+import sys
+
 from .base import BaseLLMProvider, LLMProviderMeta
 from storage import DatabaseManager, ProviderType
 from config import logger
-from typing import Dict, Optional, List, Any, Type
+from typing import Dict, Optional, List, Any, Tuple, Type
 
 
 class ProviderManager:
@@ -11,12 +13,27 @@ class ProviderManager:
         self.storage = storage
         self._provider_classes: Dict[str, Type[BaseLLMProvider]] = {}
         self._provider_configs: Dict[str, Dict[str, Any]] = {}
-        self._provider_instances: Dict[str, BaseLLMProvider] = {}
+        # Keyed by (name, model): tuple hashing of two small strings beats
+        # building an f-string key on every hot-path lookup
+        self._provider_instances: Dict[
+            Tuple[str, Optional[str]], BaseLLMProvider
+        ] = {}
+        # Model lists are fixed at runtime; cache per provider name
+        self._models_cache: Dict[str, List[str]] = {}
+        # Availability is a pure function of registry state and the two
+        # call arguments; memoized per (in_conversation, current) pair
+        self._available_cache: Dict[Tuple[bool, Optional[str]], List[str]] = {}
+        # Merged constructor kwargs per (name, model), materialized at load
+        # time so instantiation misses skip the copy-and-update dance
+        self._configs_by_key: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
         logger.info("ProviderManager initialized")
 
     def load_providers(self, config_obj: Any) -> None:
         """Auto-discover and configure providers from the registry"""
         registered_count = 0
+        self._models_cache.clear()
+        self._available_cache.clear()
+        self._configs_by_key.clear()
 
         for name, cls in LLMProviderMeta.registry.items():
             try:
@@ -25,6 +42,7 @@ class ProviderManager:
                 if provider_config is not None:
                     self._provider_classes[name] = cls
                     self._provider_configs[name] = provider_config
+                    self._prefill_models_cache(name, cls, provider_config)
                     registered_count += 1
                     logger.info(f"Loaded provider: {name}")
                 else:
@@ -34,28 +52,58 @@ class ProviderManager:
 
         logger.info(f"Total providers loaded: {registered_count}")
 
+    def _prefill_models_cache(
+        self, name: str, cls: Type[BaseLLMProvider], provider_config: Dict[str, Any]
+    ) -> None:
+        """Resolve the model list from static class/config state at load time.
+
+        Model lists are fixed for the process lifetime, so resolving them
+        here means get_available_models/get_default_model never construct a
+        provider instance (and its HTTP client) just to read a list.
+        """
+        models = getattr(cls, "AVAILABLE_MODELS", None)
+        if models:
+            self._models_cache[name] = list(models)
+        elif provider_config.get("model"):
+            self._models_cache[name] = [provider_config["model"]]
+
+        self._configs_by_key[(name, None)] = provider_config
+        for model in self._models_cache.get(name, ()):
+            self._configs_by_key[(name, model)] = {**provider_config, "model": model}
+
     def get_provider(self, name: str, model: Optional[str] = None) -> BaseLLMProvider:
         """Get or create provider instance"""
-        cache_key = f"{name}:{model}" if model else name
+        # Names arrive from DB rows / callback payloads as fresh strings;
+        # interning lines them up with the registry's interned keys
+        name = sys.intern(name)
+        cache_key = (name, model)
 
-        if cache_key not in self._provider_instances:
+        instance = self._provider_instances.get(cache_key)
+        if instance is None:
             if name not in self._provider_classes:
                 raise ValueError(f"Unknown or unconfigured provider: {name}")
 
-            config = self._provider_configs[name].copy()
-            if model:
-                config["model"] = model
+            # Prefer the merged kwargs materialized at load time; fall back
+            # to a one-off merge for models outside the advertised list
+            config = self._configs_by_key.get(cache_key)
+            if config is None:
+                base = self._provider_configs[name]
+                config = {**base, "model": model} if model else base
 
             try:
-                self._provider_instances[cache_key] = self._provider_classes[name](
+                new_instance = self._provider_classes[name](
                     storage=self.storage, **config
                 )
-                logger.info(f"Created provider instance: {cache_key}")
             except Exception as e:
                 logger.error(f"Failed to instantiate provider '{name}': {e}")
                 raise
+            # setdefault keeps exactly one instance (and its client sockets)
+            # alive if this ever races; the loser is dropped before use
+            instance = self._provider_instances.setdefault(cache_key, new_instance)
+            if instance is new_instance:
+                logger.info(f"Created provider instance: {name}:{model}")
 
-        return self._provider_instances[cache_key]
+        return instance
 
     def get_available_providers(
         self,
@@ -63,37 +111,45 @@ class ProviderManager:
         current_provider: Optional[str] = None,
     ) -> List[str]:
         """Get providers available in current context"""
-        all_providers = list(self._provider_classes.keys())
+        cache_key = (in_active_conversation, current_provider)
+        cached = self._available_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
         if not in_active_conversation:
-            return all_providers
-
-        filtered = []
-        for name in all_providers:
-            if name == current_provider:
-                filtered.append(name)
-                continue
-
-            try:
-                provider_instance = self.get_provider(name)
-                if provider_instance.provider_type != ProviderType.SERVER_HISTORY:
-                    filtered.append(name)
-            except Exception:
-                continue
-
-        return filtered
+            result = list(self._provider_classes.keys())
+        else:
+            # provider_type lives on the class, so filtering never constructs
+            # provider instances (and their HTTP clients) just to read an enum
+            result = []
+            for name, cls in self._provider_classes.items():
+                if name == current_provider:
+                    result.append(name)
+                elif getattr(cls, "provider_type", None) != ProviderType.SERVER_HISTORY:
+                    result.append(name)
+
+        self._available_cache[cache_key] = result
+        return result
 
     def get_available_models(self, provider_name: str) -> List[str]:
         """Get available models for a provider"""
+        provider_name = sys.intern(provider_name)
+        cached = self._models_cache.get(provider_name)
+        if cached is not None:
+            return cached
+
         if provider_name not in self._provider_classes:
             return []
 
         try:
             provider = self.get_provider(provider_name)
-            return provider.get_available_models()
+            models = list(provider.get_available_models())
         except Exception:
             return []
 
+        self._models_cache[provider_name] = models
+        return models
+
     def get_default_model(self, provider_name: str) -> str:
         """Get default model for a provider"""
         models = self.get_available_models(provider_name)
@@ -12,12 +12,29 @@ from .models import (
 from decorators import db_lock_retry
 
 import asyncio
+import hashlib
+from collections import OrderedDict, defaultdict
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+
+import aiofiles
+from typing import Optional, List, Dict, Any, Callable, Tuple
 
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy import select, delete
-from sqlalchemy.orm import selectinload
+from sqlalchemy.pool import StaticPool
+from sqlalchemy import select, delete, event, func, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.sql import Select
+from sqlalchemy.orm import selectinload, joinedload, raiseload
+
+
+def _with_raiseload(stmt: Select[Any], *loaders: Any) -> Select[Any]:
+    """Attach eager loaders plus a raiseload('*') sentinel.
+
+    Any relationship not explicitly eager-loaded raises instead of
+    emitting a lazy SELECT per row inside async code, so accidental
+    N+1 patterns fail fast in development rather than stalling aiosqlite.
+    """
+    return stmt.options(*loaders, raiseload("*"))
 
 
 class DatabaseManager:
@@ -26,37 +43,226 @@ class DatabaseManager:
     def __init__(self, db_path: str):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Asset payloads live here, content-addressed by SHA-256
+        self.assets_dir = self.db_path.parent / "assets"
 
         db_url = f"sqlite+aiosqlite:///{self.db_path}"
-        self.engine = create_async_engine(db_url, echo=False, future=True)
+        # StaticPool pins one warm connection for the whole process: no
+        # per-session fd open/close and the PRAGMAs below run exactly once
+        self.engine = create_async_engine(
+            db_url,
+            echo=False,
+            future=True,
+            poolclass=StaticPool,
+            connect_args={"timeout": 30, "check_same_thread": False},
+        )
+
+        # WAL + busy_timeout let SQLite serialize concurrent writers in C
+        # instead of bubbling 'database is locked' up to db_lock_retry loops
+        @event.listens_for(self.engine.sync_engine, "connect")
+        def _set_sqlite_pragmas(dbapi_conn: Any, _record: Any) -> None:
+            cursor = dbapi_conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA cache_size=-20000")
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
 
         self.session_factory = async_sessionmaker(
             self.engine, expire_on_commit=False, class_=AsyncSession
         )
 
-        # Initialize schema asynchronously (managed by start-up routine or auto-run)
-        asyncio.create_task(self._initialize_schema())
+        # Set once the schema exists; data methods wait on it as a backstop
+        # so nothing can query before CREATE TABLE has run
+        self._ready = asyncio.Event()
+
+        # Write-through LRUs for the two hottest read paths: keyboard state
+        # (re-fetched per button press) and user settings (per message)
+        self._kb_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._settings_cache: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+
+        # Single writer per conversation: concurrent saves of the same
+        # thread serialize here instead of colliding on the SQLite lock
+        self._conv_locks: "defaultdict[str, asyncio.Lock]" = defaultdict(asyncio.Lock)
+
+        # Callbacks fired after every conversation save; lets callers that
+        # cache conversations (the controller's LRU) stay coherent with
+        # saves issued from other paths such as the settings menu
+        self._conv_saved_listeners: List[Callable[[Conversation], None]] = []
+
+    def add_conversation_saved_listener(
+        self, callback: Callable[[Conversation], None]
+    ) -> None:
+        """Register a sync callback invoked after each conversation save"""
+        self._conv_saved_listeners.append(callback)
+
+    @staticmethod
+    def _cache_put(cache: "OrderedDict[Any, Any]", key: Any, value: Any, cap: int) -> None:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > cap:
+            cache.popitem(last=False)
+
+    async def init(self) -> None:
+        """Create the schema; await this at startup before serving requests"""
+        await self._initialize_schema()
 
     async def _initialize_schema(self) -> None:
         """Initialize database schema using SQLAlchemy meta_data"""
         try:
             async with self.engine.begin() as conn:
                 await conn.run_sync(Base.metadata.create_all)
+            await self._migrate_assets_schema()
             logger.info(f"Database initialized at {self.db_path}")
+            self._ready.set()
         except Exception as e:
             logger.error(f"Failed to initialize database: {e}")
             raise
 
+    async def _migrate_assets_schema(self) -> None:
+        """Move pre-file-store asset blobs out of the database.
+
+        create_all never alters existing tables, so databases created
+        before assets were content-addressed still have a file_data BLOB
+        column and lack file_path/file_sha256. Add the columns, backfill
+        every blob into the file store, then drop the old column.
+        """
+        async with self.engine.begin() as conn:
+            result = await conn.execute(text("PRAGMA table_info(assets)"))
+            cols = {row[1] for row in result}
+            if "file_data" not in cols:
+                return
+
+            if "file_path" not in cols:
+                await conn.execute(
+                    text("ALTER TABLE assets ADD COLUMN file_path VARCHAR")
+                )
+                await conn.execute(
+                    text("ALTER TABLE assets ADD COLUMN file_sha256 VARCHAR")
+                )
+
+            rows = (
+                await conn.execute(
+                    text(
+                        "SELECT asset_id, file_data FROM assets "
+                        "WHERE file_data IS NOT NULL"
+                    )
+                )
+            ).all()
+            for asset_id, data in rows:
+                sha = hashlib.sha256(data).hexdigest()
+                path = self.assets_dir / sha[:2] / sha
+                if not path.exists():
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    async with aiofiles.open(path, "wb") as f:
+                        await f.write(data)
+                await conn.execute(
+                    text(
+                        "UPDATE assets SET file_path = :p, file_sha256 = :s "
+                        "WHERE asset_id = :i"
+                    ),
+                    {"p": str(path), "s": sha, "i": asset_id},
+                )
+
+            try:
+                await conn.execute(text("ALTER TABLE assets DROP COLUMN file_data"))
+            except Exception:
+                # SQLite < 3.35 has no DROP COLUMN: rebuild the table from
+                # the current model and copy the migrated rows across
+                await conn.execute(
+                    text("ALTER TABLE assets RENAME TO assets_migrating")
+                )
+                await conn.run_sync(lambda sync_conn: Asset.__table__.create(sync_conn))
+                await conn.execute(
+                    text(
+                        "INSERT INTO assets (asset_id, page_id, file_name, "
+                        "file_path, file_sha256, language, size, created_at) "
+                        "SELECT asset_id, page_id, file_name, file_path, "
+                        "file_sha256, language, size, created_at "
+                        "FROM assets_migrating"
+                    )
+                )
+                await conn.execute(text("DROP TABLE assets_migrating"))
+
+            logger.info(f"Migrated {len(rows)} asset blobs to the file store")
+
     @db_lock_retry
     async def save_conversation(self, conversation: Conversation) -> None:
+        # One upsert for the parent row plus one executemany for the new
+        # messages; merge() with its cascade would SELECT-then-INSERT each
+        # message, doubling aiosqlite round-trips per turn
+        await self._ready.wait()
+        lock = self._conv_locks[conversation.conversation_id]
+        async with lock:
+            await self._save_conversation_locked(conversation)
+        # Uncontended after release: drop the entry so the map doesn't keep
+        # one lock per conversation ever saved. No await between the check
+        # and the pop, and a waiter that already holds the lock object keeps
+        # the entry alive via the locked()/waiter guard.
+        if not lock.locked() and not getattr(lock, "_waiters", None):
+            self._conv_locks.pop(conversation.conversation_id, None)
+        for callback in self._conv_saved_listeners:
+            callback(conversation)
+
+    async def _save_conversation_locked(self, conversation: Conversation) -> None:
+        new_messages = [
+            m
+            for m in conversation.messages
+            if m.message_id is None and not getattr(m, "_persisted", False)
+        ]
+
         async with self.session_factory() as session:
-            await session.merge(conversation)
+            conv_stmt = (
+                sqlite_insert(Conversation.__table__)
+                .values(
+                    conversation_id=conversation.conversation_id,
+                    chat_id=conversation.chat_id,
+                    topic_id=conversation.topic_id,
+                    topic_name=conversation.topic_name,
+                    meta_data=conversation.meta_data_json,
+                    created_at=conversation.created_at,
+                    updated_at=conversation.updated_at,
+                )
+                .on_conflict_do_update(
+                    index_elements=["conversation_id"],
+                    set_={
+                        "topic_name": conversation.topic_name,
+                        "meta_data": conversation.meta_data_json,
+                        "updated_at": conversation.updated_at,
+                    },
+                )
+            )
+            await session.execute(conv_stmt)
+
+            if new_messages:
+                await session.execute(
+                    ConversationMessage.__table__.insert(),
+                    [
+                        {
+                            "conversation_id": conversation.conversation_id,
+                            "role": m._role,
+                            "content": m.content,
+                            "timestamp": m.timestamp,
+                            "meta_data": m.meta_data_json,
+                        }
+                        for m in new_messages
+                    ],
+                )
+
             await session.commit()
 
+        # Mark only after a successful commit so db_lock_retry re-runs
+        # still see these rows as pending
+        for m in new_messages:
+            m._persisted = True
+
     @db_lock_retry
     async def load_conversation(
         self, chat_id: int, topic_id: Optional[int]
     ) -> Optional[Conversation]:
+        await self._ready.wait()
         async with self.session_factory() as session:
             stmt = (
                 select(Conversation)
@@ -64,16 +270,25 @@ class DatabaseManager:
                 .where(Conversation.topic_id == topic_id)
                 .order_by(Conversation.updated_at.desc())
                 .limit(1)
-                .options(selectinload(Conversation.messages))
+            )
+            # joinedload instead of selectinload: a single-parent load pays
+            # one SQL round-trip instead of two over aiosqlite, and there is
+            # no row explosion with exactly one conversation
+            stmt = _with_raiseload(
+                stmt,
+                joinedload(Conversation.messages).undefer(
+                    ConversationMessage.content
+                ),
             )
             result = await session.execute(stmt)
-            conversation = result.scalar_one_or_none()
+            conversation = result.unique().scalar_one_or_none()
             return conversation
 
     @db_lock_retry
     async def save_web_page(
         self, page_id: str, conversation_id: str, message_index: int
     ) -> None:
+        await self._ready.wait()
         async with self.session_factory() as session:
             page = WebPage(
                 page_id=page_id,
@@ -86,38 +301,105 @@ class DatabaseManager:
     @db_lock_retry
     async def load_web_page(self, page_id: str) -> Optional[str]:
         """Load content dynamically from messages table via WebPage linkage"""
+        await self._ready.wait()
         async with self.session_factory() as session:
-            stmt_page = select(WebPage).where(WebPage.page_id == page_id)
-            result_page = await session.execute(stmt_page)
-            page = result_page.scalar_one_or_none()
-
-            if not page:
-                return None
-
-            stmt_msg = (
-                select(ConversationMessage)
-                .where(ConversationMessage.conversation_id == page.conversation_id)
+            # Single round-trip: the WebPage row is folded in as scalar
+            # subqueries instead of a separate SELECT awaited first
+            conv_id_sq = (
+                select(WebPage.conversation_id)
+                .where(WebPage.page_id == page_id)
+                .scalar_subquery()
+            )
+            # coalesce: a missing page makes the subquery NULL, which SQLite
+            # rejects as an OFFSET; the WHERE clause already yields no rows
+            index_sq = func.coalesce(
+                select(WebPage.message_index)
+                .where(WebPage.page_id == page_id)
+                .scalar_subquery(),
+                0,
+            )
+            stmt = (
+                select(ConversationMessage.content)
+                .where(ConversationMessage.conversation_id == conv_id_sq)
                 .order_by(ConversationMessage.timestamp.asc())
                 .limit(1)
-                .offset(page.message_index)
+                .offset(index_sq)
             )
 
-            result_msg = await session.execute(stmt_msg)
-            msg = result_msg.scalar_one_or_none()
-
-            return msg.content if msg else None
+            result = await session.execute(stmt)
+            return result.scalar_one_or_none()
 
     @db_lock_retry
     async def save_asset(self, page_id: str, asset: Asset) -> None:
+        await self._ready.wait()
+        await self._store_asset_blob(asset)
         async with self.session_factory() as session:
             asset.page_id = page_id
             await session.merge(asset)
             await session.commit()
 
+    @db_lock_retry
+    async def save_assets(self, page_id: str, assets: List[Asset]) -> None:
+        """Persist several assets in one transaction.
+
+        Blob writes fan out concurrently, then a single upsert batch
+        replaces one session/commit round-trip per asset.
+        """
+        if not assets:
+            return
+        await self._ready.wait()
+        await asyncio.gather(*(self._store_asset_blob(a) for a in assets))
+        async with self.session_factory() as session:
+            stmt = sqlite_insert(Asset.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["asset_id"],
+                set_={
+                    "page_id": stmt.excluded.page_id,
+                    "file_name": stmt.excluded.file_name,
+                    "file_path": stmt.excluded.file_path,
+                    "file_sha256": stmt.excluded.file_sha256,
+                    "language": stmt.excluded.language,
+                    "size": stmt.excluded.size,
+                },
+            )
+            await session.execute(
+                stmt,
+                [
+                    {
+                        "asset_id": a.asset_id,
+                        "page_id": page_id,
+                        "file_name": a.file_name,
+                        "file_path": a.file_path,
+                        "file_sha256": a.file_sha256,
+                        "language": a.language,
+                        "size": a.size,
+                    }
+                    for a in assets
+                ],
+            )
+            await session.commit()
+
+    async def _store_asset_blob(self, asset: Asset) -> None:
+        """Write the payload to disk and point the row at it.
+
+        Content addressing dedupes identical payloads for free: an existing
+        file means the bytes are already on disk and the write is skipped.
+        """
+        data = asset.file_data
+        sha = hashlib.sha256(data).hexdigest()
+        path = self.assets_dir / sha[:2] / sha
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            async with aiofiles.open(path, "wb") as f:
+                await f.write(data)
+        asset.file_path = str(path)
+        asset.file_sha256 = sha
+
     @db_lock_retry
     async def load_assets(self, page_id: str) -> List[Asset]:
+        await self._ready.wait()
         async with self.session_factory() as session:
-            stmt = (
+            stmt = _with_raiseload(
                 select(Asset).where(Asset.page_id == page_id).order_by(Asset.asset_id)
             )
             result = await session.execute(stmt)
@@ -125,8 +407,9 @@ class DatabaseManager:
 
     @db_lock_retry
     async def load_asset(self, page_id: str, asset_id: str) -> Optional[Asset]:
+        await self._ready.wait()
         async with self.session_factory() as session:
-            stmt = (
+            stmt = _with_raiseload(
                 select(Asset)
                 .where(Asset.page_id == page_id)
                 .where(Asset.asset_id == asset_id)
@@ -136,19 +419,44 @@ class DatabaseManager:
 
     @db_lock_retry
     async def save_keyboard_state(self, page_id: str, keyboard_json: str) -> None:
+        await self._ready.wait()
+        self._cache_put(self._kb_cache, page_id, keyboard_json, 1024)
         async with self.session_factory() as session:
             state = KeyboardState(page_id=page_id, keyboard_json=keyboard_json)
             await session.merge(state)
             await session.commit()
 
+    @db_lock_retry
+    async def save_keyboard_states_bulk(self, items: List[Tuple[str, str]]) -> None:
+        """Write several keyboard states in one transaction"""
+        await self._ready.wait()
+        for page_id, keyboard_json in items:
+            self._cache_put(self._kb_cache, page_id, keyboard_json, 1024)
+        async with self.session_factory() as session:
+            for page_id, keyboard_json in items:
+                await session.merge(
+                    KeyboardState(page_id=page_id, keyboard_json=keyboard_json)
+                )
+            await session.commit()
+
     @db_lock_retry
     async def load_keyboard_state(self, page_id: str) -> Optional[str]:
+        cached = self._kb_cache.get(page_id)
+        if cached is not None:
+            self._kb_cache.move_to_end(page_id)
+            return cached
+        await self._ready.wait()
         async with self.session_factory() as session:
             result = await session.get(KeyboardState, page_id)
-            return result.keyboard_json if result else None
+            if result is None:
+                return None
+            self._cache_put(self._kb_cache, page_id, result.keyboard_json, 1024)
+            return result.keyboard_json
 
     @db_lock_retry
     async def delete_keyboard_state(self, page_id: str) -> None:
+        await self._ready.wait()
+        self._kb_cache.pop(page_id, None)
         async with self.session_factory() as session:
             stmt = delete(KeyboardState).where(KeyboardState.page_id == page_id)
             await session.execute(stmt)
@@ -156,14 +464,24 @@ class DatabaseManager:
 
     @db_lock_retry
     async def get_user_settings(self, user_id: int) -> Dict[str, Any]:
+        cached = self._settings_cache.get(user_id)
+        if cached is not None:
+            self._settings_cache.move_to_end(user_id)
+            return cached
+        await self._ready.wait()
         async with self.session_factory() as session:
             result = await session.get(UserSetting, user_id)
             if result:
+                self._cache_put(
+                    self._settings_cache, user_id, result.settings_json, 4096
+                )
                 return result.settings_json
             return {"default_provider": "perplexity", "default_model": "auto"}
 
     @db_lock_retry
     async def save_user_settings(self, user_id: int, settings: Dict[str, Any]) -> None:
+        await self._ready.wait()
+        self._cache_put(self._settings_cache, user_id, settings, 4096)
         async with self.session_factory() as session:
             user_setting = UserSetting(user_id=user_id, settings_json=settings)
             await session.merge(user_setting)
@@ -173,21 +491,52 @@ class DatabaseManager:
     async def get_conversation_by_id(
         self, conversation_id: str
     ) -> Optional[Conversation]:
+        await self._ready.wait()
         async with self.session_factory() as session:
-            stmt = (
-                select(Conversation)
-                .where(Conversation.conversation_id == conversation_id)
-                .options(selectinload(Conversation.messages))
+            stmt = _with_raiseload(
+                select(Conversation).where(
+                    Conversation.conversation_id == conversation_id
+                ),
+                selectinload(Conversation.messages).undefer(
+                    ConversationMessage.content
+                ),
+            )
+            result = await session.execute(stmt)
+            return result.scalar_one_or_none()
+
+    @db_lock_retry
+    async def get_conversation_meta(
+        self, conversation_id: str
+    ) -> Optional[Conversation]:
+        """Load a conversation without its messages.
+
+        For callers that only read meta_data (provider, model, thread ids)
+        this skips streaming the whole message history over aiosqlite;
+        touching .messages on the result raises instead of lazy-loading.
+        """
+        await self._ready.wait()
+        async with self.session_factory() as session:
+            stmt = _with_raiseload(
+                select(Conversation).where(
+                    Conversation.conversation_id == conversation_id
+                )
             )
             result = await session.execute(stmt)
             return result.scalar_one_or_none()
 
     @db_lock_retry
     async def get_conversation_id_by_prefix(self, prefix: str) -> Optional[str]:
+        await self._ready.wait()
         async with self.session_factory() as session:
+            # Range comparison instead of LIKE: the planner always turns this
+            # into a btree range scan on the TEXT primary key, whereas LIKE
+            # optimization depends on case_sensitive_like
             stmt = (
                 select(Conversation.conversation_id)
-                .where(Conversation.conversation_id.like(f"{prefix}%"))
+                .where(
+                    Conversation.conversation_id >= prefix,
+                    Conversation.conversation_id < prefix + "\uffff",
+                )
                 .limit(1)
             )
             result = await session.execute(stmt)
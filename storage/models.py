@@ -1,6 +1,9 @@
 from typing import Optional, Dict, List, Any, TypeVar, Generic, Self, overload, cast
 from datetime import datetime, timezone
 from enum import Enum, auto
+from pathlib import Path
+
+import aiofiles
 
 from sqlalchemy import (
     String,
@@ -9,11 +12,12 @@ from sqlalchemy import (
     ForeignKey,
     JSON,
     DateTime,
-    LargeBinary,
     BigInteger,
+    func,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.ext.asyncio import AsyncAttrs
+from sqlalchemy.ext.mutable import MutableDict
 
 T = TypeVar("T")
 
@@ -21,9 +25,12 @@ T = TypeVar("T")
 class JSONProperty(Generic[T]):
     """
     Descriptor for convenient access to keys within a JSON column.
-    Automatically handles dictionary copying to ensure SQLAlchemy detects changes.
+    The columns use MutableDict, so in-place writes are change-tracked
+    without copying the whole dictionary per assignment.
     """
 
+    __slots__ = ("json_field_name", "key", "default")
+
     def __init__(self, json_field_name: str, key: str, default: Optional[T] = None):
         self.json_field_name = json_field_name
         self.key = key
@@ -56,13 +63,12 @@ class JSONProperty(Generic[T]):
         return cast(Optional[T], value)
 
     def __set__(self, instance: Any, value: T) -> None:
-        # Retrieve existing dictionary or create a new one
-        current_data = getattr(instance, self.json_field_name) or {}
-
-        new_data = current_data.copy()
-        new_data[self.key] = value
-
-        setattr(instance, self.json_field_name, new_data)
+        data = getattr(instance, self.json_field_name)
+        if data is None:
+            data = {}
+            setattr(instance, self.json_field_name, data)
+        # In-place write; MutableDict flags the column dirty for us
+        data[self.key] = value
 
 
 class MessageRole(Enum):
@@ -88,6 +94,11 @@ class ProviderCapability(Enum):
     STREAMING = auto()
 
 
+# One dict-get per role read instead of Enum.__call__'s type checks;
+# hydration touches this once per message row
+_ROLE_LOOKUP = {m.value: m for m in MessageRole}
+
+
 class Base(AsyncAttrs, DeclarativeBase):
     """Base class for all ORM models"""
 
@@ -107,19 +118,26 @@ class ConversationMessage(Base):
     )
 
     _role: Mapped[str] = mapped_column("role", String, nullable=False)
-    content: Mapped[str] = mapped_column(Text, nullable=False)
+    # Deferred: metadata-only scans (roles, timestamps) skip streaming the
+    # message bodies; history loads undefer it explicitly
+    content: Mapped[str] = mapped_column(Text, nullable=False, deferred=True)
+    # Python-side default is kept deliberately: message ordering relies on
+    # microsecond timestamps, and SQLite's CURRENT_TIMESTAMP only has
+    # second resolution, which would tie messages saved in one batch
     timestamp: Mapped[datetime] = mapped_column(
-        DateTime, default=lambda: datetime.now(timezone.utc)
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        server_default=func.now(),
     )
     meta_data_json: Mapped[Dict[str, Any]] = mapped_column(
-        "meta_data", JSON, default=dict
+        "meta_data", MutableDict.as_mutable(JSON), default=dict
     )
 
     conversation: Mapped["Conversation"] = relationship(back_populates="messages")
 
     @property
     def role(self) -> MessageRole:
-        return MessageRole(self._role)
+        return _ROLE_LOOKUP[self._role]
 
     @role.setter
     def role(self, value: MessageRole) -> None:
@@ -156,15 +174,20 @@ class Conversation(Base):
     topic_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)
     topic_name: Mapped[str] = mapped_column(String, nullable=False)
     meta_data_json: Mapped[Dict[str, Any]] = mapped_column(
-        "meta_data", JSON, default=dict
+        "meta_data", MutableDict.as_mutable(JSON), default=dict
     )
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, default=lambda: datetime.now(timezone.utc)
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        server_default=func.now(),
     )
+    # updated_at keeps its Python default too: it orders topic lookups and
+    # is written explicitly by the upsert in save_conversation
     updated_at: Mapped[datetime] = mapped_column(
         DateTime,
         default=lambda: datetime.now(timezone.utc),
-        onupdate=lambda: datetime.now(timezone.utc),
+        onupdate=func.now(),
+        server_default=func.now(),
     )
 
     messages: Mapped[List[ConversationMessage]] = relationship(
@@ -229,13 +252,16 @@ class WebPage(Base):
         ForeignKey("conversations.conversation_id"), nullable=False, index=True
     )
     message_index: Mapped[int] = mapped_column(Integer, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(
-        DateTime, default=lambda: datetime.now(timezone.utc)
-    )
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
 
 class Asset(Base):
-    """File asset associated with a web page"""
+    """File asset associated with a web page.
+
+    The payload lives on disk, content-addressed by SHA-256; the row keeps
+    only the path and hash so asset listings stay small instead of pulling
+    every blob through the SQLite row decoder.
+    """
 
     __tablename__ = "assets"
 
@@ -244,12 +270,11 @@ class Asset(Base):
         ForeignKey("web_pages.page_id"), nullable=False, index=True
     )
     file_name: Mapped[str] = mapped_column(String, nullable=False)
-    file_data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    file_path: Mapped[str] = mapped_column(String, nullable=False)
+    file_sha256: Mapped[str] = mapped_column(String, nullable=False)
     language: Mapped[str] = mapped_column(String, nullable=False)
     size: Mapped[int] = mapped_column(Integer, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(
-        DateTime, default=lambda: datetime.now(timezone.utc)
-    )
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
     def __init__(
         self,
@@ -261,10 +286,32 @@ class Asset(Base):
     ):
         self.asset_id = asset_id
         self.file_name = file_name
-        self.file_data = file_data
+        self._data = file_data
         self.language = language
         self.size = size if size is not None else len(file_data)
 
+    @property
+    def file_data(self) -> bytes:
+        """Payload bytes: in-memory before save, read from disk after load.
+
+        The disk read is synchronous; on the event loop use read_data()
+        instead so a large payload cannot stall other tasks.
+        """
+        data: Optional[bytes] = getattr(self, "_data", None)
+        if data is None:
+            data = Path(self.file_path).read_bytes()
+            self._data = data
+        return data
+
+    async def read_data(self) -> bytes:
+        """Async counterpart of file_data for use inside handlers"""
+        data: Optional[bytes] = getattr(self, "_data", None)
+        if data is None:
+            async with aiofiles.open(self.file_path, "rb") as f:
+                data = await f.read()
+            self._data = data
+        return data
+
 
 class UserSetting(Base):
     """User specific settings"""
@@ -273,12 +320,10 @@ class UserSetting(Base):
 
     user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
     settings_json: Mapped[Dict[str, Any]] = mapped_column(
-        "settings", JSON, nullable=False
+        "settings", MutableDict.as_mutable(JSON), nullable=False
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime,
-        default=lambda: datetime.now(timezone.utc),
-        onupdate=lambda: datetime.now(timezone.utc),
+        DateTime, server_default=func.now(), onupdate=func.now()
     )
 
     default_provider: JSONProperty[str] = JSONProperty(
@@ -296,6 +341,4 @@ class KeyboardState(Base):
 
     page_id: Mapped[str] = mapped_column(String, primary_key=True)
     keyboard_json: Mapped[str] = mapped_column(Text, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(
-        DateTime, default=lambda: datetime.now(timezone.utc)
-    )
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
@@ -1,6 +1,210 @@
+import copy
 import sys
+from datetime import datetime
 from pathlib import Path
+from unittest.mock import MagicMock, AsyncMock
+
+import pytest
 
 root_dir = Path(__file__).parent.parent
 
 sys.path.insert(0, str(root_dir))
+
+from aiogram.types import Message, CallbackQuery  # noqa: E402
+from aiogram.enums import ChatType  # noqa: E402
+
+from core.bot_controller import BotController  # noqa: E402
+from decorators.decorators import _CIRCUIT_STATES, _RATE_LIMITS  # noqa: E402
+from utils.formatter import MessageFormatter  # noqa: E402
+
+
+# MessageFormatter holds no per-instance state (its tables are built per
+# call), so one instance serves the whole session
+@pytest.fixture(scope="session")
+def formatter():
+    return MessageFormatter()
+
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+
+if uvloop is not None:
+    # pytest-asyncio picks this hook up and runs every async test on a
+    # uvloop loop; when uvloop is absent the hook is simply not defined
+    # and the default loop factory applies
+    def pytest_asyncio_loop_factories(config, item):
+        return {"uvloop": uvloop.new_event_loop}
+
+
+@pytest.fixture(autouse=True)
+def reset_decorator_state():
+    """Reset global decorator state dictionaries between tests."""
+    _CIRCUIT_STATES.clear()
+    _RATE_LIMITS.clear()
+    yield
+
+
+# Module scope: spec introspection of the mocked classes is the dominant
+# fixture cost, so build each mock once; test_core.py resets them per test
+@pytest.fixture(scope="module")
+def mock_bot():
+    bot = AsyncMock()
+    bot.send_message = AsyncMock()
+    bot.edit_message_text = AsyncMock()
+    bot.edit_message_reply_markup = AsyncMock()
+    bot.create_forum_topic = AsyncMock()
+    bot.get_file = AsyncMock()
+    bot.download_file = AsyncMock()
+    return bot
+
+
+@pytest.fixture(scope="module")
+def mock_storage():
+    storage = AsyncMock()
+    # Default mocks for common calls
+    storage.get_user_settings.return_value = {
+        "default_provider": "mock_prov",
+        "default_model": "mock_model",
+    }
+    storage.save_conversation = AsyncMock()
+    storage.load_conversation = AsyncMock(return_value=None)
+    storage.save_web_page = AsyncMock()
+    storage.save_asset = AsyncMock()
+    storage.save_user_settings = AsyncMock()
+    storage.save_keyboard_state = AsyncMock()
+    storage.load_keyboard_state = AsyncMock(return_value=None)
+    storage.delete_keyboard_state = AsyncMock()
+    storage.get_conversation_by_id = AsyncMock()
+    # Sync registration hook; an AsyncMock here would leave the
+    # controller's listener call as a never-awaited coroutine
+    storage.add_conversation_saved_listener = MagicMock()
+    return storage
+
+
+@pytest.fixture(scope="module")
+def mock_provider_instance():
+    """A mock LLM provider instance that yields a predictable stream."""
+    provider = MagicMock()
+
+    async def async_gen(*args, **kwargs):
+        yield "Hello "
+        yield "World"
+
+    provider.generate_response = MagicMock(side_effect=async_gen)
+    provider.create_extra_buttons.return_value = []
+    provider.capabilities = []
+    provider.get_available_models.return_value = ["mock_model"]
+    return provider
+
+
+@pytest.fixture(scope="module")
+def mock_provider_manager(mock_provider_instance):
+    manager = MagicMock()
+    manager.get_provider.return_value = mock_provider_instance
+    manager.get_available_providers.return_value = ["mock_prov", "other_prov"]
+    manager.get_available_models.return_value = ["mock_model"]
+    manager.get_default_model.return_value = "mock_model"
+    # Mock internal dict for strategy access
+    manager._provider_classes = {"mock_prov": MagicMock(), "other_prov": MagicMock()}
+    return manager
+
+
+@pytest.fixture(scope="module")
+def mock_web_server():
+    server = MagicMock()
+    server.get_answer_url.return_value = "http://localhost/answer/123"
+    return server
+
+
+@pytest.fixture(scope="module")
+def mock_formatter():
+    formatter = MagicMock()
+    # Return simple tuple: (List[str messages], List[Asset assets])
+    async def format_resp(text):
+        return [text], []
+
+    formatter.format_response_for_telegram = AsyncMock(side_effect=format_resp)
+    return formatter
+
+
+@pytest.fixture
+def controller(
+    mock_bot, mock_storage, mock_provider_manager, mock_web_server, mock_formatter
+):
+    return BotController(
+        bot=mock_bot,
+        storage=mock_storage,
+        provider_manager=mock_provider_manager,
+        web_server=mock_web_server,
+        formatter=mock_formatter,
+    )
+
+
+# Prototypes built once and cloned per test. Message and CallbackQuery keep
+# spec= because @operation routes on isinstance checks against the aiogram
+# types; everything else skips the dir()/signature introspection spec costs.
+# Every attribute the tests or the code under test touch is assigned
+# explicitly on the clone below.
+_MSG_PROTO = AsyncMock(spec=Message)
+_CHAT_PROTO = MagicMock()
+_USER_PROTO = MagicMock()
+_CB_PROTO = AsyncMock(spec=CallbackQuery)
+
+
+# Helper to create a mock Message that works with await AND isinstance checks
+def create_mock_message(text="test", user_id=123, chat_id=-100, thread_id=None):
+    msg = copy.copy(_MSG_PROTO)
+
+    msg.message_id = 1
+    msg.date = datetime.now()
+
+    msg.chat = copy.copy(_CHAT_PROTO)
+    msg.chat.id = chat_id
+    msg.chat.type = ChatType.SUPERGROUP
+
+    # Assign explicitly to avoid attribute access errors with spec
+    user = copy.copy(_USER_PROTO)
+    user.id = user_id
+    user.first_name = "TestUser"
+    msg.from_user = user
+
+    msg.text = text
+    msg.message_thread_id = thread_id
+
+    msg.caption = None
+    msg.document = None
+    msg.photo = None
+    msg.media_group_id = None
+
+    # Ensure methods are AsyncMock so they can be awaited
+    msg.reply = AsyncMock()
+    msg.answer = AsyncMock()
+    msg.edit_reply_markup = AsyncMock()
+    msg.delete = AsyncMock()
+    msg.edit_message_text = AsyncMock()
+
+    return msg
+
+
+@pytest.fixture
+def callback_factory():
+    """Build mock CallbackQuery objects from the cached spec'd prototype."""
+
+    def make_callback(data):
+        callback = copy.copy(_CB_PROTO)
+        callback.reset_mock()
+        callback.id = "1"
+        callback.data = data
+
+        user = copy.copy(_USER_PROTO)
+        user.id = 123
+        callback.from_user = user
+
+        callback.answer = AsyncMock()
+        callback.message = create_mock_message()
+        return callback
+
+    return make_callback
@@ -1,94 +1,63 @@
 import os
 import pytest
-from unittest import mock
-from config.settings import EnvVar, Config
+from config.settings import Config
 
 
-@pytest.fixture(autouse=True)
-def reset_config_state():
-    """
-    The EnvVar descriptor caches values in `_value` and sets `_loaded` to True
-    after the first access. We must reset this state before every test to
-    ensure tests are isolated and don't see values from previous tests.
-    """
-    for attr_name, attr_value in Config.__dict__.items():
-        if isinstance(attr_value, EnvVar):
-            attr_value._loaded = False
-            attr_value._value = None
-    yield
+def set_env(monkeypatch, env):
+    """Swap os.environ for a minimal dict; monkeypatch restores it after.
 
+    Cheaper than mock.patch.dict, which snapshots and restores the whole
+    environment through a generator context manager per test.
+    """
+    monkeypatch.setattr(os, "environ", dict(env))
 
-class TestEnvVar:
-    """Tests for the EnvVar descriptor logic handling casting and defaults."""
-
-    def test_defaults_returned_when_missing(self):
-        """Ensure default value is used if env var is unset."""
 
-        class TestObj:
-            VAR = EnvVar("TEST_KEY", default="my_default")
+class TestConfigLoad:
+    """Tests for the frozen Config loading, casting, and validation."""
 
-        with mock.patch.dict(os.environ, {}, clear=True):
-            assert TestObj.VAR == "my_default"
+    def test_defaults_returned_when_missing(self, monkeypatch):
+        """Ensure default values are used if env vars are unset."""
+        set_env(monkeypatch, {})
+        cfg = Config.load()
+        assert cfg.PROVIDER_NAME == "perplexity"
+        assert cfg.WEB_HOST == "127.0.0.1"
+        assert cfg.BOT_TOKEN is None
 
-    def test_string_retrieval(self):
+    def test_string_retrieval(self, monkeypatch):
         """Ensure basic string values are loaded."""
+        set_env(monkeypatch, {"PROVIDER_NAME": "groq"})
+        assert Config.load().PROVIDER_NAME == "groq"
 
-        class TestObj:
-            VAR = EnvVar("TEST_KEY")
-
-        with mock.patch.dict(os.environ, {"TEST_KEY": "actual_value"}):
-            assert TestObj.VAR == "actual_value"
-
-    def test_int_casting(self):
+    def test_int_casting(self, monkeypatch):
         """Ensure values are cast to integer correctly."""
+        set_env(monkeypatch, {"WEB_PORT": "42"})
+        assert Config.load().WEB_PORT == 42
 
-        class TestObj:
-            VAR = EnvVar("TEST_INT", cast=int)
-
-        with mock.patch.dict(os.environ, {"TEST_INT": "42"}):
-            assert TestObj.VAR == 42
-
-    def test_float_casting(self):
+    def test_float_casting(self, monkeypatch):
         """Ensure values are cast to float correctly."""
+        set_env(monkeypatch, {"MIN_UPDATE_INTERVAL": "3.14"})
+        assert Config.load().MIN_UPDATE_INTERVAL == 3.14
 
-        class TestObj:
-            VAR = EnvVar("TEST_FLOAT", cast=float)
-
-        with mock.patch.dict(os.environ, {"TEST_FLOAT": "3.14"}):
-            assert TestObj.VAR == 3.14
-
-    def test_bool_casting(self):
-        """Test boolean variations."""
-
-        class TestObj:
-            V1 = EnvVar("K1", cast=bool)
-            V2 = EnvVar("K2", cast=bool)
-            V3 = EnvVar("K3", cast=bool)
-
-        env = {"K1": "true", "K2": "0", "K3": "yes"}
-        with mock.patch.dict(os.environ, env):
-            assert TestObj.V1 is True
-            assert TestObj.V2 is False
-            assert TestObj.V3 is True
-
-    def test_required_validation(self):
+    def test_required_validation(self, monkeypatch):
         """Ensure validation error raised for missing required variables."""
+        set_env(monkeypatch, {})
+        cfg = Config.load()
+        with pytest.raises(ValueError, match="Missing required environment variable"):
+            cfg.validate()
 
-        class TestObj:
-            VAR = EnvVar("REQUIRED_KEY", required=True)
-
-        with mock.patch.dict(os.environ, {}, clear=True):
-            with pytest.raises(
-                ValueError, match="Missing required environment variable"
-            ):
-                _ = TestObj.VAR
+    def test_required_validation_passes(self, monkeypatch):
+        """Ensure validation succeeds when required variables are present."""
+        set_env(monkeypatch, {"BOT_TOKEN": "123:abc"})
+        Config.load().validate()
 
-    def test_type_error_validation(self):
+    def test_type_error_validation(self, monkeypatch):
         """Ensure ValueError raised when casting fails."""
-
-        class TestObj:
-            VAR = EnvVar("NUM_KEY", cast=int)
-
-        with mock.patch.dict(os.environ, {"NUM_KEY": "not_a_number"}):
-            with pytest.raises(ValueError, match="Config 'NUM_KEY' must be int"):
-                _ = TestObj.VAR
+        set_env(monkeypatch, {"WEB_PORT": "not_a_number"})
+        with pytest.raises(ValueError, match="Config 'WEB_PORT' must be int"):
+            Config.load()
+
+    def test_frozen_instance(self):
+        """Ensure loaded config is immutable."""
+        cfg = Config.load()
+        with pytest.raises(AttributeError):
+            cfg.WEB_PORT = 9999
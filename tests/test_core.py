@@ -1,142 +1,39 @@
 import pytest
 from unittest.mock import MagicMock, AsyncMock
-from datetime import datetime
 
-from aiogram.types import Chat, User, Document, Message, CallbackQuery
-from aiogram.enums import ChatType
-
-from core.bot_controller import BotController
+from conftest import create_mock_message
 from storage.models import Conversation, MessageRole
-from storage.database import DatabaseManager
-from providers.provider_manager import ProviderManager
-from utils.webserver import WebServer
-from utils.formatter import MessageFormatter
-
-
-@pytest.fixture
-def mock_bot():
-    bot = AsyncMock()
-    bot.send_message = AsyncMock()
-    bot.edit_message_text = AsyncMock()
-    bot.edit_message_reply_markup = AsyncMock()
-    bot.create_forum_topic = AsyncMock()
-    bot.get_file = AsyncMock()
-    bot.download_file = AsyncMock()
-    return bot
-
-
-@pytest.fixture
-def mock_storage():
-    storage = AsyncMock(spec=DatabaseManager)
-    # Default mocks for common calls
-    storage.get_user_settings.return_value = {
+
+
+# Autouse stays file-local: only this file exercises the shared controller
+# mocks, so other files never pull their module-scoped builders into scope
+@pytest.fixture(autouse=True)
+def _reset_mocks(
+    mock_bot,
+    mock_storage,
+    mock_provider_instance,
+    mock_provider_manager,
+    mock_web_server,
+    mock_formatter,
+):
+    """Clear call records on the shared mocks and re-apply test defaults."""
+    for m in (
+        mock_bot,
+        mock_storage,
+        mock_provider_instance,
+        mock_provider_manager,
+        mock_web_server,
+        mock_formatter,
+    ):
+        m.reset_mock(return_value=False, side_effect=False)
+    # Defaults that individual tests override
+    mock_storage.get_user_settings.return_value = {
         "default_provider": "mock_prov",
         "default_model": "mock_model",
     }
-    storage.save_conversation = AsyncMock()
-    storage.load_conversation = AsyncMock(return_value=None)
-    storage.save_web_page = AsyncMock()
-    storage.save_asset = AsyncMock()
-    storage.save_user_settings = AsyncMock()
-    storage.save_keyboard_state = AsyncMock()
-    storage.load_keyboard_state = AsyncMock(return_value=None)
-    storage.delete_keyboard_state = AsyncMock()
-    storage.get_conversation_by_id = AsyncMock()
-    return storage
-
-
-@pytest.fixture
-def mock_provider_instance():
-    """A mock LLM provider instance that yields a predictable stream."""
-    provider = MagicMock()
-
-    async def async_gen(*args, **kwargs):
-        yield "Hello "
-        yield "World"
-
-    provider.generate_response = MagicMock(side_effect=async_gen)
-    provider.create_extra_buttons.return_value = []
-    provider.capabilities = []
-    provider.get_available_models.return_value = ["mock_model"]
-    return provider
-
-
-@pytest.fixture
-def mock_provider_manager(mock_provider_instance):
-    manager = MagicMock(spec=ProviderManager)
-    manager.get_provider.return_value = mock_provider_instance
-    manager.get_available_providers.return_value = ["mock_prov", "other_prov"]
-    manager.get_available_models.return_value = ["mock_model"]
-    manager.get_default_model.return_value = "mock_model"
-    # Mock internal dict for strategy access
-    manager._provider_classes = {"mock_prov": MagicMock(), "other_prov": MagicMock()}
-    return manager
-
-
-@pytest.fixture
-def mock_web_server():
-    server = MagicMock(spec=WebServer)
-    server.get_answer_url.return_value = "http://localhost/answer/123"
-    return server
-
-
-@pytest.fixture
-def mock_formatter():
-    formatter = MagicMock(spec=MessageFormatter)
-    # Return simple tuple: (List[str messages], List[Asset assets])
-    async def format_resp(text):
-        return [text], []
-
-    formatter.format_response_for_telegram = AsyncMock(side_effect=format_resp)
-    return formatter
-
-
-@pytest.fixture
-def controller(
-    mock_bot, mock_storage, mock_provider_manager, mock_web_server, mock_formatter
-):
-    return BotController(
-        bot=mock_bot,
-        storage=mock_storage,
-        provider_manager=mock_provider_manager,
-        web_server=mock_web_server,
-        formatter=mock_formatter,
-    )
-
-
-# Helper to create a mock Message that works with await AND isinstance checks
-def create_mock_message(text="test", user_id=123, chat_id=-100, thread_id=None):
-    msg = AsyncMock(spec=Message)
-
-    msg.message_id = 1
-    msg.date = datetime.now()
-
-    msg.chat = MagicMock(spec=Chat)
-    msg.chat.id = chat_id
-    msg.chat.type = ChatType.SUPERGROUP
-
-    # Assign explicitly to avoid attribute access errors with spec
-    user = MagicMock(spec=User)
-    user.id = user_id
-    user.first_name = "TestUser"
-    msg.from_user = user
-
-    msg.text = text
-    msg.message_thread_id = thread_id
-
-    msg.caption = None
-    msg.document = None
-    msg.photo = None
-    msg.media_group_id = None
-
-    # Ensure methods are AsyncMock so they can be awaited
-    msg.reply = AsyncMock()
-    msg.answer = AsyncMock()
-    msg.edit_reply_markup = AsyncMock()
-    msg.delete = AsyncMock()
-    msg.edit_message_text = AsyncMock()
-
-    return msg
+    mock_storage.load_conversation.return_value = None
+    mock_storage.load_keyboard_state.return_value = None
+    yield
 
 
 @pytest.mark.asyncio
@@ -221,7 +118,7 @@ async def test_handle_attachment_upload(controller, mock_bot):
     """Test handling a document upload (queuing it for the next prompt)."""
     message = create_mock_message(text=None)
 
-    doc = MagicMock(spec=Document)
+    doc = MagicMock()
     doc.file_id = "file_123"
     doc.file_name = "test.py"
     doc.mime_type = "text/x-python"
@@ -230,6 +127,7 @@ async def test_handle_attachment_upload(controller, mock_bot):
     # Mock file download
     mock_file_info = MagicMock()
     mock_file_info.file_path = "path/to/file"
+    mock_file_info.file_size = None
     mock_bot.get_file.return_value = mock_file_info
 
     # Simulate download_file writing to BytesIO
@@ -246,8 +144,8 @@ async def test_handle_attachment_upload(controller, mock_bot):
     # Assert attachment is queued in controller memory
     assert 123 in controller._pending_attachments
     assert len(controller._pending_attachments[123]) == 1
-    assert controller._pending_attachments[123][0]["filename"] == "test.py"
-    assert controller._pending_attachments[123][0]["data"] == b"print('hello')"
+    assert controller._pending_attachments[123][0].filename == "test.py"
+    assert controller._pending_attachments[123][0].data == b"print('hello')"
 
     # Assert confirmation reply
     message.reply.assert_called_with(
@@ -255,122 +153,65 @@ async def test_handle_attachment_upload(controller, mock_bot):
     )
 
 
-@pytest.mark.asyncio
-async def test_settings_open_menu(controller, mock_storage):
-    """Test opening the settings menu for a user context."""
-    handler = controller.keyboard_handler
-
-    # Setup mock callback with spec=CallbackQuery for isinstance check
-    callback = AsyncMock(spec=CallbackQuery)
-    callback.id = "1"
-    callback.data = "settings:u:open:123"
-
-    # Explicitly assign user mock
-    user = MagicMock(spec=User)
-    user.id = 123
-    callback.from_user = user
-
-    # Explicitly assign answer to AsyncMock to avoid TypeError in await
-    callback.answer = AsyncMock()
-
-    # Setup mock message inside callback
-    msg = create_mock_message()
-    msg.reply_markup = MagicMock()
-    callback.message = msg
-
-    mock_storage.get_user_settings.return_value = {
-        "default_provider": "perplexity",
-        "default_model": "auto",
-    }
-
-    # Execute
-    await handler.handle_unified_callback(callback)
+def _menu_button_texts(msg):
+    """Flatten the keyboard the handler rendered into button labels."""
+    assert msg.edit_reply_markup.called
+    keyboard = msg.edit_reply_markup.call_args[1]["reply_markup"]
+    return [btn.text for row in keyboard.inline_keyboard for btn in row]
 
-    # Assertions
-    # Should save old keyboard state
-    handler.state_manager.storage.save_keyboard_state.assert_called()
 
-    # Should edit message with new menu
-    assert msg.edit_reply_markup.called
-    kwargs = msg.edit_reply_markup.call_args[1]
-    keyboard = kwargs["reply_markup"]
+async def _check_open_menu(handler, callback, mock_storage):
+    """Opening the menu queues old keyboard state and renders settings."""
+    # Flush drains the write-behind batch queued by the open
+    await handler.state_manager.flush()
+    mock_storage.save_keyboard_states_bulk.assert_called()
 
-    # Check keyboard structure
-    buttons = [btn.text for row in keyboard.inline_keyboard for btn in row]
-    assert any("Provider: perplexity" in b for b in buttons)
-    assert any("Model: auto" in b for b in buttons)
+    buttons = _menu_button_texts(callback.message)
+    assert any("Provider: mock_prov" in b for b in buttons)
+    assert any("Model: mock_model" in b for b in buttons)
 
     # Should answer callback to stop loading animation
     callback.answer.assert_called()
 
 
-@pytest.mark.asyncio
-async def test_settings_navigation_provider_list(
-    controller, mock_storage, mock_provider_manager
-):
-    """Test navigating to the provider selection list."""
-    handler = controller.keyboard_handler
-
-    callback = AsyncMock(spec=CallbackQuery)
-    callback.id = "1"
-    callback.data = "settings:u:nav:123:prov"
-
-    user = MagicMock(spec=User)
-    user.id = 123
-    callback.from_user = user
-
-    # Explicitly assign answer to AsyncMock
-    callback.answer = AsyncMock()
-
-    msg = create_mock_message()
-    callback.message = msg
-
-    # Execute
-    await handler.handle_unified_callback(callback)
-
-    # Assertions
-    assert msg.edit_reply_markup.called
-    kwargs = msg.edit_reply_markup.call_args[1]
-    keyboard = kwargs["reply_markup"]
-
-    # Should list providers from provider_manager
-    buttons = [btn.text for row in keyboard.inline_keyboard for btn in row]
+async def _check_provider_list(handler, callback, mock_storage):
+    """Navigation renders the providers from provider_manager."""
+    buttons = _menu_button_texts(callback.message)
     assert "mock_prov" in buttons
     assert "other_prov" in buttons
 
 
-@pytest.mark.asyncio
-async def test_settings_pick_provider(controller, mock_storage):
-    """Test actually selecting a new provider."""
-    handler = controller.keyboard_handler
-
-    callback = AsyncMock(spec=CallbackQuery)
-    callback.id = "1"
+async def _check_pick_provider(handler, callback, mock_storage):
+    """Picking a provider persists the new default."""
+    mock_storage.save_user_settings.assert_called()
+    call_args = mock_storage.save_user_settings.call_args
+    assert call_args[0][0] == 123
+    assert call_args[0][1]["default_provider"] == "other_prov"
 
-    user = MagicMock(spec=User)
-    user.id = 123
-    callback.from_user = user
+    callback.answer.assert_called()
 
-    # Explicitly assign answer to AsyncMock
-    callback.answer = AsyncMock()
 
-    # Calculate hash for "other_prov"
-    prov_name = "other_prov"
-    h = handler._hash_val(prov_name)
-    callback.data = f"settings:u:pick:123:prov:{h}"
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "callback_data, check",
+    [
+        ("settings:u:open:123", _check_open_menu),
+        ("settings:u:nav:123:prov", _check_provider_list),
+        # "other_prov" is index 1 in the provider list
+        ("settings:u:pick:123:prov:1", _check_pick_provider),
+    ],
+    ids=["open_menu", "provider_list", "pick_provider"],
+)
+async def test_settings_callbacks(
+    controller, mock_storage, callback_factory, callback_data, check
+):
+    """Shared scaffolding for the settings callback flows; each row
+    supplies the callback payload and its flow-specific assertions."""
+    handler = controller.keyboard_handler
 
-    msg = create_mock_message()
-    callback.message = msg
+    callback = callback_factory(callback_data)
+    callback.message.reply_markup = MagicMock()
 
-    # Execute
     await handler.handle_unified_callback(callback)
 
-    # Assertions
-    # Should update settings in DB
-    mock_storage.save_user_settings.assert_called()
-    call_args = mock_storage.save_user_settings.call_args
-    assert call_args[0][0] == 123
-    assert call_args[0][1]["default_provider"] == "other_prov"
-
-    # Should answer callback
-    callback.answer.assert_called()
+    await check(handler, callback, mock_storage)
@@ -6,7 +6,9 @@ from aiogram.exceptions import (
     TelegramBadRequest,
     TelegramNetworkError,
 )
-from aiogram.types import Message, CallbackQuery, User
+# Message/CallbackQuery keep spec= in the tests below because @operation
+# routes on isinstance checks against the aiogram types
+from aiogram.types import Message, CallbackQuery
 
 from decorators.decorators import (
     resilient_request,
@@ -19,31 +21,60 @@ from decorators.decorators import (
 )
 
 
-@pytest.fixture(autouse=True)
-def reset_decorator_state():
-    """Reset global state dictionaries between tests."""
-    _CIRCUIT_STATES.clear()
-    _RATE_LIMITS.clear()
-    yield
+# Shared error instances: SQLAlchemy and aiogram exceptions have non-trivial
+# constructors, and side_effect re-raises the same object safely
+_LOCKED_ERR = OperationalError("database is locked", params={}, orig=None)
+_SYNTAX_ERR = OperationalError("syntax error", params={}, orig=None)
+_RETRY_ERR = TelegramRetryAfter(method="post", message="wait", retry_after=5)
+
+
+async def _noop_sleep(*args, **kwargs):
+    return None
 
 
 @pytest.fixture
-def mock_sleep():
-    """Mock asyncio.sleep to execute immediately."""
+def no_sleep(monkeypatch):
+    """Make asyncio.sleep return immediately.
+
+    A plain coroutine function: every retry loop iteration skips
+    AsyncMock's call recording and spec bookkeeping. Tests that assert
+    on sleep calls use mock_sleep instead.
+    """
+    monkeypatch.setattr("asyncio.sleep", _noop_sleep)
+
+
+# The patchers run once per module; the function-scoped fixtures below
+# hand out the same mock after a per-test reset, avoiding N patch/unpatch
+# cycles across the suite
+@pytest.fixture(scope="module")
+def _sleep_patch():
     with patch("asyncio.sleep", new_callable=AsyncMock) as mock:
         yield mock
 
 
-@pytest.fixture
-def mock_time():
-    """Mock time.time to allow controlling flow."""
+@pytest.fixture(scope="module")
+def _time_patch():
     with patch("time.time") as mock:
-        mock.return_value = 1000.0
         yield mock
 
 
+@pytest.fixture
+def mock_sleep(_sleep_patch):
+    """Mock asyncio.sleep to execute immediately and record calls."""
+    _sleep_patch.reset_mock()
+    return _sleep_patch
+
+
+@pytest.fixture
+def mock_time(_time_patch):
+    """Mock time.time to allow controlling flow."""
+    _time_patch.reset_mock()
+    _time_patch.return_value = 1000.0
+    return _time_patch
+
+
 @pytest.mark.asyncio
-async def test_resilient_request_success(mock_sleep):
+async def test_resilient_request_success(no_sleep):
     """Test normal execution without errors."""
     func = AsyncMock(return_value="Success")
     wrapped = resilient_request()(func)
@@ -67,7 +98,7 @@ async def test_resilient_request_retries(mock_sleep):
 
 
 @pytest.mark.asyncio
-async def test_resilient_request_max_retries_exceeded(mock_sleep):
+async def test_resilient_request_max_retries_exceeded(no_sleep):
     """Test that it raises exception after max retries."""
     func = AsyncMock(side_effect=Exception("Persistent Fail"))
     wrapped = resilient_request(max_retries=2)(func)
@@ -81,8 +112,7 @@ async def test_resilient_request_max_retries_exceeded(mock_sleep):
 @pytest.mark.asyncio
 async def test_telegram_retry_after(mock_sleep):
     """Test handling of TelegramRetryAfter (Rate Limit from API)."""
-    retry_err = TelegramRetryAfter(method="post", message="wait", retry_after=5)
-    func = AsyncMock(side_effect=[retry_err, "Success"])
+    func = AsyncMock(side_effect=[_RETRY_ERR, "Success"])
     wrapped = resilient_request()(func)
 
     result = await wrapped()
@@ -103,7 +133,7 @@ async def test_telegram_bad_request_not_modified():
 
 
 @pytest.mark.asyncio
-async def test_circuit_breaker_trips(mock_time, mock_sleep):
+async def test_circuit_breaker_trips(mock_time, no_sleep):
     """Test that the circuit breaker opens after failures."""
     func = AsyncMock(side_effect=TelegramNetworkError(method="test", message="Net err"))
     wrapped = resilient_request(scope="test_scope", use_circuit_breaker=True)(func)
@@ -130,7 +160,7 @@ async def test_circuit_breaker_trips(mock_time, mock_sleep):
 
 
 @pytest.mark.asyncio
-async def test_circuit_breaker_recovery(mock_time, mock_sleep):
+async def test_circuit_breaker_recovery(mock_time, no_sleep):
     """Test that circuit breaker attempts recovery after timeout."""
     # Setup open state manually
     _CIRCUIT_STATES["test_scope"] = CircuitBreakerState(
@@ -163,7 +193,7 @@ async def test_operation_catches_exception():
 async def test_operation_notifies_user_on_error():
     """Test that @operation tries to send an error message to user."""
     msg = AsyncMock(spec=Message)
-    msg.from_user = MagicMock(spec=User)
+    msg.from_user = MagicMock()
     msg.from_user.id = 123
 
     func = AsyncMock(side_effect=Exception("Boom"))
@@ -182,7 +212,7 @@ async def test_operation_validates_callback():
 
     cb = AsyncMock(spec=CallbackQuery)
     cb.data = "invalid:data"
-    cb.from_user = MagicMock(spec=User)
+    cb.from_user = MagicMock()
     cb.from_user.id = 123
     cb.answer = AsyncMock()
 
@@ -195,23 +225,21 @@ async def test_operation_validates_callback():
 
 
 @pytest.mark.asyncio
-async def test_db_lock_retry_success(mock_sleep):
+async def test_db_lock_retry_success(no_sleep):
     """Test retries on 'database is locked'."""
-    # Fail twice with lock, then succeed
-    locked_error = OperationalError("database is locked", params={}, orig=None)
-    func = AsyncMock(side_effect=[locked_error, locked_error, "Success"])
+    # Fail once with lock, then succeed on the backstop retry
+    func = AsyncMock(side_effect=[_LOCKED_ERR, "Success"])
     wrapped = db_lock_retry(func)
 
     result = await wrapped()
     assert result == "Success"
-    assert func.call_count == 3
+    assert func.call_count == 2
 
 
 @pytest.mark.asyncio
-async def test_db_lock_retry_fatal_error(mock_sleep):
+async def test_db_lock_retry_fatal_error(no_sleep):
     """Test that other OperationalErrors are raised immediately."""
-    syntax_error = OperationalError("syntax error", params={}, orig=None)
-    func = AsyncMock(side_effect=syntax_error)
+    func = AsyncMock(side_effect=_SYNTAX_ERR)
     wrapped = db_lock_retry(func)
 
     with pytest.raises(OperationalError, match="syntax error"):
@@ -221,16 +249,15 @@ async def test_db_lock_retry_fatal_error(mock_sleep):
 
 
 @pytest.mark.asyncio
-async def test_db_lock_retry_exhausted(mock_sleep):
+async def test_db_lock_retry_exhausted(no_sleep):
     """Test exhaustion of retries."""
-    locked_error = OperationalError("database is locked", params={}, orig=None)
-    func = AsyncMock(side_effect=locked_error)
+    func = AsyncMock(side_effect=_LOCKED_ERR)
     wrapped = db_lock_retry(func)
 
-    with pytest.raises(OperationalError, match="Database locked after 5 retries"):
+    with pytest.raises(OperationalError, match="Database locked after 2 retries"):
         await wrapped()
 
-    assert func.call_count == 5
+    assert func.call_count == 2
 
 
 def sync_task(x):
@@ -1,17 +1,50 @@
 import pytest
+from dataclasses import dataclass
+from typing import List
 from unittest.mock import MagicMock, AsyncMock, patch, ANY
 
 from storage.models import Conversation, MessageRole, ProviderType
-from storage.database import DatabaseManager
 from providers.provider_manager import ProviderManager
 from providers.base import LLMProviderMeta
+from providers.base import AttachmentInput
 from providers.openai_compatible import OpenAICompatibleProvider
 from providers.perplexity import PerplexityProvider
 
 
+# Hand-rolled stubs for streamed completion chunks: the code under test only
+# reads chunk.choices[0].delta.content, and a frozen dataclass costs a
+# fraction of a MagicMock chain to build
+@dataclass(frozen=True)
+class _Delta:
+    content: str
+
+
+@dataclass(frozen=True)
+class _Choice:
+    delta: _Delta
+
+
+@dataclass(frozen=True)
+class _Chunk:
+    choices: List[_Choice]
+
+
+def _make_chunk(content: str) -> _Chunk:
+    return _Chunk(choices=[_Choice(delta=_Delta(content=content))])
+
+
+# SSE wire fixture built once at import; the per-test iterator just walks it
+SSE_LINES = (
+    b'data: {"backend_uuid": "t1"}',
+    b'data: {"blocks": [{"intended_usage": "ask_text", "markdown_block": {"chunks": ["Hello"], "chunk_starting_offset": 0}}]}',
+    b'data: {"blocks": [{"intended_usage": "ask_text", "markdown_block": {"chunks": [" World"], "chunk_starting_offset": 1}}]}',
+)
+
+
 @pytest.fixture
 def mock_storage():
-    return AsyncMock(spec=DatabaseManager)
+    # Providers only store the reference; nothing here awaits storage calls
+    return AsyncMock()
 
 
 @pytest.fixture
@@ -69,17 +102,17 @@ class TestProviderManager:
         manager = ProviderManager(mock_storage)
 
         # Setup Perplexity (Server History)
-        pplx_mock = MagicMock()
-        pplx_mock.provider_type = ProviderType.SERVER_HISTORY
+        pplx_cls = MagicMock()
+        pplx_cls.provider_type = ProviderType.SERVER_HISTORY
 
         # Setup Groq (Client History)
-        groq_mock = MagicMock()
-        groq_mock.provider_type = ProviderType.CLIENT_HISTORY
+        groq_cls = MagicMock()
+        groq_cls.provider_type = ProviderType.CLIENT_HISTORY
 
-        # Inject instances directly into the manager's cache for testing
-        manager._provider_classes = {"perplexity": MagicMock(), "groq": MagicMock()}
+        # Inject classes directly into the manager for testing; filtering
+        # reads provider_type off the class without instantiation
+        manager._provider_classes = {"perplexity": pplx_cls, "groq": groq_cls}
         manager._provider_configs = {"perplexity": {}, "groq": {}}
-        manager._provider_instances = {"perplexity": pplx_mock, "groq": groq_mock}
 
         # Case 1: New conversation (not active) -> Show all
         available = manager.get_available_providers(in_active_conversation=False)
@@ -129,37 +162,38 @@ class TestOpenAIProvider:
     def test_prepare_messages_with_attachments(self, provider, sample_conversation):
         """Test text attachments are appended to content."""
         attachments = [
-            {
-                "filename": "test.py",
-                "content_type": "text/x-python",
-                "data": b"print('hi')",
-            }
+            AttachmentInput(
+                filename="test.py",
+                content_type="text/x-python",
+                data=b"print('hi')",
+            )
         ]
 
         msgs = provider._prepare_messages(sample_conversation, attachments)
 
         last_msg = msgs[-1]
-        assert "print('hi')" in str(last_msg["content"])
-        assert "test.py" in str(last_msg["content"])
+        # Inspect the structured content directly rather than stringifying
+        # the whole mixed-content list
+        text_parts = [
+            item["text"] for item in last_msg["content"] if item["type"] == "text"
+        ]
+        assert any("print('hi')" in text for text in text_parts)
+        assert any("test.py" in text for text in text_parts)
 
     @pytest.mark.asyncio
     async def test_generate_response_stream(self, provider, sample_conversation):
         """Test streaming response."""
-        # Mock the completion stream
-        mock_chunk = MagicMock()
-        mock_chunk.choices = [MagicMock()]
-        mock_chunk.choices[0].delta.content = "Hello "
 
-        mock_chunk2 = MagicMock()
-        mock_chunk2.choices = [MagicMock()]
-        mock_chunk2.choices[0].delta.content = "World"
+        # Plain coroutine standing in for create(): no AsyncMock allocation
+        # or call bookkeeping, just the stream the code under test iterates
+        async def fake_create(**kwargs):
+            async def gen():
+                yield _make_chunk("Hello ")
+                yield _make_chunk("World")
 
-        # Create an async generator
-        async def async_iter():
-            yield mock_chunk
-            yield mock_chunk2
+            return gen()
 
-        provider.client.chat.completions.create = AsyncMock(return_value=async_iter())
+        provider.client.chat.completions.create = fake_create
 
         # Execute
         chunks = []
@@ -180,12 +214,12 @@ class TestPerplexityProvider:
             prov.session = mock_session_cls.return_value
             return prov
 
-    def test_cookie_parsing(self, mock_storage):
+    def test_cookie_parsing(self):
         """Test that cookie string is parsed into dict."""
-        with patch("providers.perplexity.AsyncSession"):
-            prov = PerplexityProvider(mock_storage, "key1=val1; key2=val2")
-            assert prov.cookies_dict["key1"] == "val1"
-            assert prov.cookies_dict["key2"] == "val2"
+        # Pure parsing check: no provider construction or patching needed
+        parsed = PerplexityProvider._parse_cookies("key1=val1; key2=val2")
+        assert parsed["key1"] == "val1"
+        assert parsed["key2"] == "val2"
 
     @pytest.mark.asyncio
     async def test_generate_response_sse_parsing(self, provider, sample_conversation):
@@ -194,22 +228,22 @@ class TestPerplexityProvider:
         mock_resp = MagicMock()
         mock_resp.ok = True
 
-        lines_fixed = [
-            b'data: {"backend_uuid": "t1"}',
-            b'data: {"blocks": [{"intended_usage": "ask_text", "markdown_block": {"chunks": ["Hello"], "chunk_starting_offset": 0}}]}',
-            b'data: {"blocks": [{"intended_usage": "ask_text", "markdown_block": {"chunks": [" World"], "chunk_starting_offset": 1}}]}',
-        ]
+        async def content_iter_fixed():
+            for line in SSE_LINES:
+                yield line + b"\n"
+
+        mock_resp.aiter_content.return_value = content_iter_fixed()
 
-        async def line_iter_fixed():
-            for line in lines_fixed:
-                yield line
+        # Plain coroutine: the test never asserts on connection call args
+        async def fake_conn(*args, **kwargs):
+            return mock_resp
 
-        mock_resp.aiter_lines.return_value = line_iter_fixed()
-        provider._establish_connection = AsyncMock(return_value=mock_resp)
+        provider._establish_connection = fake_conn
 
         chunks = []
         async for chunk in provider.generate_response(sample_conversation):
             chunks.append(chunk)
 
-        assert "Hello" in chunks
-        assert " World" in chunks
+        # Yields may be coalesced into fewer, larger strings; only the
+        # concatenated text is part of the contract
+        assert "".join(chunks) == "Hello World"
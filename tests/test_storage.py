@@ -1,46 +1,55 @@
+import hashlib
+import sqlite3
+
 import pytest
 import pytest_asyncio
-import asyncio
 from sqlalchemy import text
 
 from storage.database import DatabaseManager
 from storage.models import (
+    Base,
     Conversation,
     MessageRole,
     Asset,
 )
 
 
-@pytest.fixture
-def db_path(tmp_path):
-    """Create a temp file path for the database."""
-    d = tmp_path / "data"
-    d.mkdir()
-    return d / "test_bot.sqlite3"
+# All tests share one event loop so the module-scoped manager's connection
+# stays on the loop that created it
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
 
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def _storage_manager(tmp_path_factory):
+    """One DatabaseManager (and one schema creation) for the whole module."""
+    d = tmp_path_factory.mktemp("data")
+    manager = DatabaseManager(str(d / "test_bot.sqlite3"))
+    await manager.init()
 
-@pytest_asyncio.fixture
-async def storage(db_path):
-    """Initialize DatabaseManager with a real temp database."""
-    # Initialize manager
-    manager = DatabaseManager(str(db_path))
+    yield manager
 
-    # Wait for schema initialization to complete
-    await asyncio.sleep(0.1)
+    await manager.engine.dispose()
 
-    # Ensure schema is definitely created for the test
-    async with manager.engine.begin() as conn:
-        from storage.models import Base
 
-        await conn.run_sync(Base.metadata.create_all)
+@pytest_asyncio.fixture(loop_scope="module")
+async def storage(_storage_manager):
+    """Hand out the shared manager; wipe rows and caches after each test.
 
-    yield manager
+    Deleting rows is far cheaper than re-running DDL and disposing the
+    engine per test, and keeps every test starting from an empty database.
+    """
+    yield _storage_manager
 
-    # Teardown
-    await manager.engine.dispose()
+    async with _storage_manager.session_factory() as session:
+        for table in reversed(Base.metadata.sorted_tables):
+            await session.execute(table.delete())
+        await session.commit()
+    _storage_manager._kb_cache.clear()
+    _storage_manager._settings_cache.clear()
+    _storage_manager._conv_locks.clear()
+    _storage_manager._conv_saved_listeners.clear()
 
 
-@pytest.mark.asyncio
 async def test_schema_creation(storage):
     """Verify tables are created."""
     async with storage.session_factory() as session:
@@ -53,7 +62,6 @@ async def test_schema_creation(storage):
         assert result.scalar() == "conversations"
 
 
-@pytest.mark.asyncio
 async def test_conversation_lifecycle(storage):
     """Test creating, saving, and loading a conversation with messages."""
     # 1. Create
@@ -80,7 +88,17 @@ async def test_conversation_lifecycle(storage):
     assert loaded.messages[1].role == MessageRole.ASSISTANT
 
 
-@pytest.mark.asyncio
+async def test_conversation_saved_listener(storage):
+    """Registered listeners fire after every conversation save."""
+    seen = []
+    storage.add_conversation_saved_listener(seen.append)
+
+    conv = Conversation("uuid-listener", 9009, 7, "Listener Test")
+    await storage.save_conversation(conv)
+
+    assert seen == [conv]
+
+
 async def test_json_properties_and_metadata(storage):
     """Test that JSON properties (provider, model) are correctly serialized/deserialized."""
     conv = Conversation("uuid-2", 2002, 5, "Meta Test")
@@ -101,7 +119,6 @@ async def test_json_properties_and_metadata(storage):
     assert loaded.perplexity_thread_id == "t-123"
 
 
-@pytest.mark.asyncio
 async def test_conversation_update(storage):
     """Test adding messages to an existing conversation."""
     conv = Conversation("uuid-3", 3003, None, "Update Test")
@@ -119,7 +136,6 @@ async def test_conversation_update(storage):
     assert final.messages[1].content == "Msg 2"
 
 
-@pytest.mark.asyncio
 async def test_web_page_loading(storage):
     """Test linking a WebPage to a specific message index."""
     # Setup conversation
@@ -140,7 +156,6 @@ async def test_web_page_loading(storage):
     assert await storage.load_web_page("invalid") is None
 
 
-@pytest.mark.asyncio
 async def test_assets(storage):
     """Test binary asset storage."""
     page_id = "page-123"
@@ -161,7 +176,11 @@ async def test_assets(storage):
     assets = await storage.load_assets(page_id)
     assert len(assets) == 1
     assert assets[0].file_name == "image.png"
-    assert assets[0].file_data == data
+    # Digest compare stays O(1) if the sample payload ever grows to a real
+    # image
+    expected_sha = hashlib.sha256(data).digest()
+    loaded_data = await assets[0].read_data()
+    assert hashlib.sha256(loaded_data).digest() == expected_sha
 
     # Load specific asset
     single = await storage.load_asset(page_id, "asset-1")
@@ -169,7 +188,72 @@ async def test_assets(storage):
     assert single.asset_id == "asset-1"
 
 
-@pytest.mark.asyncio
+async def test_assets_bulk_save(storage):
+    """Test saving several assets in one transaction."""
+    page_id = "page-bulk"
+
+    conv = Conversation("uuid-bulk", 5006, None, "Bulk Asset Test")
+    await storage.save_conversation(conv)
+    await storage.save_web_page(page_id, "uuid-bulk", 0)
+
+    assets = [
+        Asset(
+            asset_id=f"asset-{i}",
+            file_name=f"file_{i}.txt",
+            file_data=f"content {i}".encode(),
+            language="text",
+        )
+        for i in range(3)
+    ]
+    await storage.save_assets(page_id, assets)
+
+    loaded = await storage.load_assets(page_id)
+    assert len(loaded) == 3
+    assert loaded[0].file_data == b"content 0"
+
+
+async def test_asset_schema_migration(tmp_path):
+    """Databases from before the file store migrate their blobs on init."""
+    db_file = tmp_path / "old.sqlite3"
+    data = b"legacy blob"
+
+    with sqlite3.connect(db_file) as conn:
+        conn.execute(
+            """
+            CREATE TABLE assets (
+                asset_id VARCHAR PRIMARY KEY,
+                page_id VARCHAR NOT NULL,
+                file_name VARCHAR NOT NULL,
+                file_data BLOB NOT NULL,
+                language VARCHAR NOT NULL,
+                size INTEGER NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        conn.execute(
+            "INSERT INTO assets (asset_id, page_id, file_name, file_data,"
+            " language, size) VALUES ('a1', 'p1', 'old.txt', ?, 'text', ?)",
+            (data, len(data)),
+        )
+
+    manager = DatabaseManager(str(db_file))
+    await manager.init()
+    try:
+        loaded = await manager.load_asset("p1", "a1")
+        assert loaded is not None
+        assert loaded.file_sha256 == hashlib.sha256(data).hexdigest()
+        assert loaded.file_data == data
+
+        # The blob column is gone and new saves use the current schema
+        async with manager.session_factory() as session:
+            result = await session.execute(text("PRAGMA table_info(assets)"))
+            cols = {row[1] for row in result}
+        assert "file_data" not in cols
+    finally:
+        await manager.engine.dispose()
+
+
 async def test_user_settings(storage):
     """Test user settings CRUD."""
     user_id = 999
@@ -188,7 +272,6 @@ async def test_user_settings(storage):
     assert updated["custom_key"] == "custom_val"
 
 
-@pytest.mark.asyncio
 async def test_keyboard_state(storage):
     """Test temporary keyboard state storage."""
     ctx_id = "ctx-1"
@@ -205,7 +288,6 @@ async def test_keyboard_state(storage):
     assert await storage.load_keyboard_state(ctx_id) is None
 
 
-@pytest.mark.asyncio
 async def test_conversation_id_by_prefix(storage):
     """Test resolving short IDs."""
     full_id = "550e8400-e29b-41d4-a716-446655440000"
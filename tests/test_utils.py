@@ -1,54 +1,85 @@
+import copy
+
 import pytest
-from unittest.mock import MagicMock, AsyncMock, patch
+from types import SimpleNamespace
+from unittest.mock import MagicMock, AsyncMock
 from aiohttp import web
 import telegramify_markdown.type
 
-from utils.formatter import MessageFormatter
 from utils.webserver import WebServer
-from storage.database import DatabaseManager
 
 
-@pytest.fixture
-def formatter():
-    return MessageFormatter()
+# Module scope: WebServer builds its aiohttp app and jinja template on
+# construction; the reset fixture below restores the only state tests touch
+@pytest.fixture(scope="module")
+def web_server(mock_storage):
+    return WebServer(mock_storage, host="127.0.0.1", port=5000)
 
 
-@pytest.fixture
-def mock_storage():
-    return AsyncMock(spec=DatabaseManager)
+@pytest.fixture(autouse=True)
+def _reset_web_server(web_server):
+    web_server.public_url = None
+    web_server._page_cache.clear()
+    yield
+
+
+# Spec introspection of the telegramify box types runs once at import;
+# tests clone these instead of re-speccing per construction. The spec is
+# kept because the formatter routes boxes via isinstance checks.
+_TEXT_PROTO = MagicMock(spec=telegramify_markdown.type.Text)
+_FILE_PROTO = MagicMock(spec=telegramify_markdown.type.File)
+
+
+def make_text_box(content):
+    box = copy.copy(_TEXT_PROTO)
+    box.content = content
+    return box
+
+
+def make_file_box(file_name, file_data):
+    box = copy.copy(_FILE_PROTO)
+    box.file_name = file_name
+    box.file_data = file_data
+    return box
 
 
 @pytest.fixture
-def web_server(mock_storage):
-    return WebServer(mock_storage, host="127.0.0.1", port=5000)
+def telegramify_mock(monkeypatch):
+    """Swap telegramify_markdown.telegramify for the test's duration.
+
+    One setattr instead of a patch() context per test; tests set
+    return_value/side_effect on the returned mock directly.
+    """
+    mock = AsyncMock()
+    monkeypatch.setattr("telegramify_markdown.telegramify", mock)
+    return mock
+
+
+# Case table built once at import and shared with the parametrize call
+LATEX_CASES = (
+    # Greek
+    (r"\alpha", "α"),
+    (r"\beta", "β"),
+    # Math
+    (r"\infty", "∞"),
+    (r"\rightarrow", "→"),
+    # Superscripts
+    ("x^2", "x²"),
+    ("x^{12}", "x¹²"),
+    ("y^n", "yⁿ"),
+    # Subscripts (only i, x supported per formatter.py implementation)
+    ("H_2O", "H₂O"),
+    ("x_{ix}", "xᵢₓ"),
+    # Fraction flattening
+    (r"\frac{a}{b}", "(a)/(b)"),
+)
 
 
 class TestMessageFormatter:
-    def test_latex_to_unicode_simple(self, formatter):
-        """Test basic LaTeX symbol conversion."""
-        # Greek
-        assert formatter._latex_to_unicode(r"\alpha") == "α"
-        assert formatter._latex_to_unicode(r"\beta") == "β"
-        # Math
-        assert formatter._latex_to_unicode(r"\infty") == "∞"
-        assert formatter._latex_to_unicode(r"\rightarrow") == "→"
-
-    def test_latex_to_unicode_superscripts(self, formatter):
-        """Test superscript conversion."""
-        assert formatter._latex_to_unicode("x^2") == "x²"
-        assert formatter._latex_to_unicode("x^{12}") == "x¹²"
-        assert formatter._latex_to_unicode("y^n") == "yⁿ"
-
-    def test_latex_to_unicode_subscripts(self, formatter):
-        """Test subscript conversion."""
-        assert formatter._latex_to_unicode("H_2O") == "H₂O"
-        # Only testing supported chars (i, x) as per formatter.py implementation
-        assert formatter._latex_to_unicode("x_{ix}") == "xᵢₓ"
-
-    def test_latex_fractions(self, formatter):
-        """Test fraction flattening."""
-        latex = r"\frac{a}{b}"
-        assert formatter._latex_to_unicode(latex) == "(a)/(b)"
+    @pytest.mark.parametrize("latex, expected", LATEX_CASES)
+    def test_latex_to_unicode(self, formatter, latex, expected):
+        """Test LaTeX symbol, script, and fraction conversion."""
+        assert formatter._latex_to_unicode(latex) == expected
 
     @pytest.mark.asyncio
     async def test_preprocess_latex_preserves_code(self, formatter):
@@ -60,7 +91,7 @@ class TestMessageFormatter:
         assert "`\\alpha`" in processed
 
     @pytest.mark.asyncio
-    async def test_format_response_splits_long_messages(self, formatter):
+    async def test_format_response_splits_long_messages(self, formatter, telegramify_mock):
         """Test that multiple blocks are split into messages if combined len > limit."""
         # Create 2 chunks that fit individually but exceed limit together
         chunk_size = 3000
@@ -68,65 +99,45 @@ class TestMessageFormatter:
         text_2 = "b" * chunk_size
 
         # Mock telegramify to return two text boxes
-        mock_box_1 = MagicMock(spec=telegramify_markdown.type.Text)
-        mock_box_1.content = text_1
+        telegramify_mock.return_value = [make_text_box(text_1), make_text_box(text_2)]
 
-        mock_box_2 = MagicMock(spec=telegramify_markdown.type.Text)
-        mock_box_2.content = text_2
+        messages, assets = await formatter.format_response_for_telegram(
+            "input ignored"
+        )
 
-        with patch(
-            "telegramify_markdown.telegramify", new_callable=AsyncMock
-        ) as mock_tg:
-            mock_tg.return_value = [mock_box_1, mock_box_2]
-
-            messages, assets = await formatter.format_response_for_telegram(
-                "input ignored"
-            )
-
-            # Should be split into 2 messages
-            assert len(messages) == 2
-            assert messages[0] == text_1
-            assert messages[1] == text_2
-            assert len(assets) == 0
+        # Should be split into 2 messages
+        assert len(messages) == 2
+        assert messages[0] == text_1
+        assert messages[1] == text_2
+        assert len(assets) == 0
 
     @pytest.mark.asyncio
-    async def test_format_response_extracts_code_assets(self, formatter):
+    async def test_format_response_extracts_code_assets(self, formatter, telegramify_mock):
         """Test that file boxes are converted to Assets and code blocks."""
 
         code_bytes = b"print('hello')"
-        # Use MagicMock for File object
-        mock_file_box = MagicMock(spec=telegramify_markdown.type.File)
-        mock_file_box.file_name = "script.py"
-        mock_file_box.file_data = code_bytes
+        telegramify_mock.return_value = [make_file_box("script.py", code_bytes)]
 
-        with patch(
-            "telegramify_markdown.telegramify", new_callable=AsyncMock
-        ) as mock_tg:
-            mock_tg.return_value = [mock_file_box]
+        messages, assets = await formatter.format_response_for_telegram("Some code")
 
-            messages, assets = await formatter.format_response_for_telegram("Some code")
+        assert len(assets) == 1
+        assert assets[0].file_name.endswith(".py")
+        assert assets[0].file_data == code_bytes
+        assert assets[0].language == "python"
 
-            assert len(assets) == 1
-            assert assets[0].file_name.endswith(".py")
-            assert assets[0].file_data == code_bytes
-            assert assets[0].language == "python"
-
-            # The message should contain a code block representation
-            assert "```python" in messages[0]
-            assert "print('hello')" in messages[0]
+        # The message should contain a code block representation
+        assert "```python" in messages[0]
+        assert "print('hello')" in messages[0]
 
     @pytest.mark.asyncio
-    async def test_fallback_on_error(self, formatter):
+    async def test_fallback_on_error(self, formatter, telegramify_mock):
         """Test fallback to simple splitting if formatting crashes."""
-        with patch(
-            "telegramify_markdown.telegramify", side_effect=Exception("Parse Error")
-        ):
-            messages, assets = await formatter.format_response_for_telegram(
-                "Simple text"
-            )
+        telegramify_mock.side_effect = Exception("Parse Error")
+
+        messages, assets = await formatter.format_response_for_telegram("Simple text")
 
-            assert messages == ["Simple text"]
-            assert assets == []
+        assert messages == ["Simple text"]
+        assert assets == []
 
 
 class TestWebServer:
@@ -137,9 +148,9 @@ class TestWebServer:
         content = "# Title\nContent"
         mock_storage.load_web_page.return_value = content
 
-        # Create a mock request
-        request = MagicMock(spec=web.Request)
-        request.match_info = {"page_id": page_id}
+        # view_answer only reads match_info, so a namespace stands in for
+        # the large web.Request surface
+        request = SimpleNamespace(match_info={"page_id": page_id})
 
         response = await web_server.view_answer(request)
 
@@ -155,8 +166,7 @@ class TestWebServer:
         """Test 404 when page missing."""
         mock_storage.load_web_page.return_value = None
 
-        request = MagicMock(spec=web.Request)
-        request.match_info = {"page_id": "missing"}
+        request = SimpleNamespace(match_info={"page_id": "missing"})
 
         with pytest.raises(web.HTTPNotFound):
             await web_server.view_answer(request)
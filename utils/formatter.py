@@ -1,8 +1,13 @@
-from config import Config, logger
+from config import CONFIG, logger
 from storage.models import Asset
 from decorators.decorators import cpu_bound
 
 from typing import Dict, List, Tuple, Any, Match
+import asyncio
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
+import os
 import re
 
 import telegramify_markdown
@@ -59,256 +64,307 @@ EXTENSION_TO_TELEGRAM_LANG = {
 }
 
 
+@lru_cache(maxsize=128)
 def map_extension_to_lang(ext: str) -> str:
     """Map file extension to Telegram language identifier"""
     return EXTENSION_TO_TELEGRAM_LANG.get(ext.lower(), ext.lower())
 
 
+# Fixed part of a rendered code fence: ```lang\n...\n```
+_FENCE_OVERHEAD_BASE = len("```\n\n```")
+
+# Inside code blocks only backticks need escaping; translate skips the
+# intermediate copy str.replace makes per chunk
+_BACKTICK_ESCAPE = str.maketrans({"`": "\\`"})
+
+
+# Compiled once at import: the formatter runs per LLM message, and the
+# per-call re-cache lookup is pure overhead on that path
+_RE_FRAC = re.compile(r"\\frac\{([^}]+)\}\{([^}]+)\}")
+_RE_SUP = re.compile(r"\^{([^}]+)}|\^([a-zA-Z0-9])")
+_RE_SUB = re.compile(r"_{([^}]+)}|_([a-zA-Z0-9])")
+_RE_CMD_ARG = re.compile(r"\\[a-zA-Z]+\{([^}]*)\}")
+_RE_CMD = re.compile(r"\\[a-zA-Z]+")
+_RE_WS = re.compile(r"\s+")
+_RE_CODE = re.compile(r"```[\s\S]*?```|`[^`\n]+`")
+_RE_DISPLAY = re.compile(r"\$\$(.*?)\$\$", re.DOTALL)
+# Greedy body: [^$\n] cannot cross the closing delimiter, so greedy and
+# lazy match identically, but greedy consumes the span in one scan
+# instead of growing it a character per backtrack step
+_RE_INLINE = re.compile(r"(?<!\$)\$(?!\$)([^$\n]+)\$(?!\$)")
+_RE_CODEFENCE = re.compile(r"```[\s\S]*?```")
+# NUL-delimited sentinel: cannot appear in LLM text, and lets one sub()
+# restore every stashed code block instead of one replace() pass per block
+_RE_CODE_SENTINEL = re.compile("\x00CB(\\d+)\x00")
+_RE_UNESCAPED = re.compile(r"(?<!\\)[_*\[\]()~`>#+\-=|{}.!]")
+
+
+# Symbol table hoisted to module scope; one alternation pass replaces
+# ~100 str.replace scans per fragment. Longest-first so e.g. \subseteq
+# wins over \subset.
+_LATEX_MAP = {
+    # Greek letters (lowercase)
+    r"\alpha": "α",
+    r"\beta": "β",
+    r"\gamma": "γ",
+    r"\delta": "δ",
+    r"\epsilon": "ε",
+    r"\zeta": "ζ",
+    r"\eta": "η",
+    r"\theta": "θ",
+    r"\iota": "ι",
+    r"\kappa": "κ",
+    r"\lambda": "λ",
+    r"\mu": "μ",
+    r"\nu": "ν",
+    r"\xi": "ξ",
+    r"\pi": "π",
+    r"\rho": "ρ",
+    r"\sigma": "σ",
+    r"\tau": "τ",
+    r"\upsilon": "υ",
+    r"\phi": "φ",
+    r"\chi": "χ",
+    r"\psi": "ψ",
+    r"\omega": "ω",
+    # Greek letters (uppercase)
+    r"\Gamma": "Γ",
+    r"\Delta": "Δ",
+    r"\Theta": "Θ",
+    r"\Lambda": "Λ",
+    r"\Xi": "Ξ",
+    r"\Pi": "Π",
+    r"\Sigma": "Σ",
+    r"\Upsilon": "Υ",
+    r"\Phi": "Φ",
+    r"\Psi": "Ψ",
+    r"\Omega": "Ω",
+    # Arrows
+    r"\rightarrow": "→",
+    r"\leftarrow": "←",
+    r"\uparrow": "↑",
+    r"\downarrow": "↓",
+    r"\Rightarrow": "⇒",
+    r"\Leftarrow": "⇐",
+    r"\Uparrow": "⇑",
+    r"\Downarrow": "⇓",
+    r"\leftrightarrow": "↔",
+    r"\Leftrightarrow": "⇔",
+    # Math operators
+    r"\partial": "∂",
+    r"\infty": "∞",
+    r"\pm": "±",
+    r"\mp": "∓",
+    r"\times": "×",
+    r"\div": "÷",
+    r"\cdot": "·",
+    r"\ast": "∗",
+    r"\leq": "≤",
+    r"\geq": "≥",
+    r"\neq": "≠",
+    r"\approx": "≈",
+    r"\equiv": "≡",
+    r"\sim": "∼",
+    r"\simeq": "≃",
+    r"\propto": "∝",
+    # Set theory
+    r"\subset": "⊂",
+    r"\supset": "⊃",
+    r"\subseteq": "⊆",
+    r"\supseteq": "⊇",
+    r"\in": "∈",
+    r"\notin": "∉",
+    r"\ni": "∋",
+    r"\emptyset": "∅",
+    r"\cup": "∪",
+    r"\cap": "∩",
+    # Logic
+    r"\forall": "∀",
+    r"\exists": "∃",
+    r"\nexists": "∄",
+    r"\therefore": "∴",
+    r"\because": "∵",
+    r"\land": "∧",
+    r"\lor": "∨",
+    r"\lnot": "¬",
+    r"\neg": "¬",
+    # Calculus
+    r"\nabla": "∇",
+    r"\sum": "∑",
+    r"\prod": "∏",
+    r"\int": "∫",
+    r"\oint": "∮",
+    r"\iint": "∬",
+    r"\iiint": "∭",
+    # Other
+    r"\sqrt": "√",
+    r"\angle": "∠",
+    r"\perp": "⊥",
+    r"\parallel": "∥",
+    r"\degree": "°",
+    r"\prime": "′",
+    r"\hbar": "ℏ",
+    r"\ell": "ℓ",
+    r"\Re": "ℜ",
+    r"\Im": "ℑ",
+    r"\aleph": "ℵ",
+    }
+
+_LATEX_RE = re.compile(
+    "|".join(re.escape(k) for k in sorted(_LATEX_MAP, key=len, reverse=True))
+)
+
+
+# Translation tables prebuilt for str.translate: one C-level pass over
+# each matched script group instead of a per-character Python loop
+_SUPER_TBL = str.maketrans({
+    "0": "⁰",
+    "1": "¹",
+    "2": "²",
+    "3": "³",
+    "4": "⁴",
+    "5": "⁵",
+    "6": "⁶",
+    "7": "⁷",
+    "8": "⁸",
+    "9": "⁹",
+    "+": "⁺",
+    "-": "⁻",
+    "=": "⁼",
+    "(": "⁽",
+    ")": "⁾",
+    "n": "ⁿ",
+    "i": "ⁱ",
+})
+
+_SUB_TBL = str.maketrans({
+    "0": "₀",
+    "1": "₁",
+    "2": "₂",
+    "3": "₃",
+    "4": "₄",
+    "5": "₅",
+    "6": "₆",
+    "7": "₇",
+    "8": "₈",
+    "9": "₉",
+    "+": "₊",
+    "-": "₋",
+    "=": "₌",
+    "(": "₍",
+    ")": "₎",
+    "a": "ₐ",
+    "e": "ₑ",
+    "i": "ᵢ",
+    "o": "ₒ",
+    "r": "ᵣ",
+    "u": "ᵤ",
+    "v": "ᵥ",
+    "x": "ₓ",
+})
+
+
+@lru_cache(maxsize=1)
+def _configure_telegramify() -> None:
+    """Configure telegramify-markdown for clean output; the config is
+    process-global, so this only needs to run once"""
+    cfg = get_runtime_config()
+    cfg.markdown_symbol.head_level_1 = ""
+    cfg.markdown_symbol.link = ""
+
+
+_configure_telegramify()
+
+
 class MessageFormatter:
     """Handle message formatting for Telegram using telegramify-markdown"""
 
     def __init__(self) -> None:
-        # Configure telegramify-markdown for clean output
-        get_runtime_config().markdown_symbol.head_level_1 = ""
-        get_runtime_config().markdown_symbol.link = ""
+        # No-op after the import-time call; kept so a formatter works even
+        # if something resets the lru_cache
+        _configure_telegramify()
 
     def _latex_to_unicode(self, latex: str) -> str:
         """Convert LaTeX to Unicode - comprehensive conversion"""
         latex = latex.strip()
 
-        # Extended conversions map
-        conversions = {
-            # Greek letters (lowercase)
-            r"\alpha": "α",
-            r"\beta": "β",
-            r"\gamma": "γ",
-            r"\delta": "δ",
-            r"\epsilon": "ε",
-            r"\zeta": "ζ",
-            r"\eta": "η",
-            r"\theta": "θ",
-            r"\iota": "ι",
-            r"\kappa": "κ",
-            r"\lambda": "λ",
-            r"\mu": "μ",
-            r"\nu": "ν",
-            r"\xi": "ξ",
-            r"\pi": "π",
-            r"\rho": "ρ",
-            r"\sigma": "σ",
-            r"\tau": "τ",
-            r"\upsilon": "υ",
-            r"\phi": "φ",
-            r"\chi": "χ",
-            r"\psi": "ψ",
-            r"\omega": "ω",
-            # Greek letters (uppercase)
-            r"\Gamma": "Γ",
-            r"\Delta": "Δ",
-            r"\Theta": "Θ",
-            r"\Lambda": "Λ",
-            r"\Xi": "Ξ",
-            r"\Pi": "Π",
-            r"\Sigma": "Σ",
-            r"\Upsilon": "Υ",
-            r"\Phi": "Φ",
-            r"\Psi": "Ψ",
-            r"\Omega": "Ω",
-            # Arrows
-            r"\rightarrow": "→",
-            r"\leftarrow": "←",
-            r"\uparrow": "↑",
-            r"\downarrow": "↓",
-            r"\Rightarrow": "⇒",
-            r"\Leftarrow": "⇐",
-            r"\Uparrow": "⇑",
-            r"\Downarrow": "⇓",
-            r"\leftrightarrow": "↔",
-            r"\Leftrightarrow": "⇔",
-            # Math operators
-            r"\partial": "∂",
-            r"\infty": "∞",
-            r"\pm": "±",
-            r"\mp": "∓",
-            r"\times": "×",
-            r"\div": "÷",
-            r"\cdot": "·",
-            r"\ast": "∗",
-            r"\leq": "≤",
-            r"\geq": "≥",
-            r"\neq": "≠",
-            r"\approx": "≈",
-            r"\equiv": "≡",
-            r"\sim": "∼",
-            r"\simeq": "≃",
-            r"\propto": "∝",
-            # Set theory
-            r"\subset": "⊂",
-            r"\supset": "⊃",
-            r"\subseteq": "⊆",
-            r"\supseteq": "⊇",
-            r"\in": "∈",
-            r"\notin": "∉",
-            r"\ni": "∋",
-            r"\emptyset": "∅",
-            r"\cup": "∪",
-            r"\cap": "∩",
-            # Logic
-            r"\forall": "∀",
-            r"\exists": "∃",
-            r"\nexists": "∄",
-            r"\therefore": "∴",
-            r"\because": "∵",
-            r"\land": "∧",
-            r"\lor": "∨",
-            r"\lnot": "¬",
-            r"\neg": "¬",
-            # Calculus
-            r"\nabla": "∇",
-            r"\sum": "∑",
-            r"\prod": "∏",
-            r"\int": "∫",
-            r"\oint": "∮",
-            r"\iint": "∬",
-            r"\iiint": "∭",
-            # Other
-            r"\sqrt": "√",
-            r"\angle": "∠",
-            r"\perp": "⊥",
-            r"\parallel": "∥",
-            r"\degree": "°",
-            r"\prime": "′",
-            r"\hbar": "ℏ",
-            r"\ell": "ℓ",
-            r"\Re": "ℜ",
-            r"\Im": "ℑ",
-            r"\aleph": "ℵ",
-        }
-
-        # Apply symbol conversions
-        for latex_cmd, unicode_char in conversions.items():
-            latex = latex.replace(latex_cmd, unicode_char)
+        # Apply symbol conversions in a single scan
+        latex = _LATEX_RE.sub(lambda m: _LATEX_MAP[m.group(0)], latex)
 
         # Handle fractions
-        latex = re.sub(r"\\frac\{([^}]+)\}\{([^}]+)\}", r"(\1)/(\2)", latex)
-
-        # Superscripts mapping
-        superscript_map = {
-            "0": "⁰",
-            "1": "¹",
-            "2": "²",
-            "3": "³",
-            "4": "⁴",
-            "5": "⁵",
-            "6": "⁶",
-            "7": "⁷",
-            "8": "⁸",
-            "9": "⁹",
-            "+": "⁺",
-            "-": "⁻",
-            "=": "⁼",
-            "(": "⁽",
-            ")": "⁾",
-            "n": "ⁿ",
-            "i": "ⁱ",
-        }
-
-        # Subscripts mapping
-        subscript_map = {
-            "0": "₀",
-            "1": "₁",
-            "2": "₂",
-            "3": "₃",
-            "4": "₄",
-            "5": "₅",
-            "6": "₆",
-            "7": "₇",
-            "8": "₈",
-            "9": "₉",
-            "+": "₊",
-            "-": "₋",
-            "=": "₌",
-            "(": "₍",
-            ")": "₎",
-            "a": "ₐ",
-            "e": "ₑ",
-            "i": "ᵢ",
-            "o": "ₒ",
-            "r": "ᵣ",
-            "u": "ᵤ",
-            "v": "ᵥ",
-            "x": "ₓ",
-        }
+        latex = _RE_FRAC.sub(r"(\1)/(\2)", latex)
 
         # Process superscripts ^{...} or ^x
         def replace_superscript(match: Match[str]) -> str:
-            text = match.group(1) if match.group(1) else match.group(2)
-            result = ""
-            for char in text:
-                result += superscript_map.get(char, char)
-            return result
+            return (match.group(1) or match.group(2)).translate(_SUPER_TBL)
 
-        latex = re.sub(r"\^{([^}]+)}|\^([a-zA-Z0-9])", replace_superscript, latex)
+        latex = _RE_SUP.sub(replace_superscript, latex)
 
         # Process subscripts _{...} or _x
         def replace_subscript(match: Match[str]) -> str:
-            text = match.group(1) if match.group(1) else match.group(2)
-            result = ""
-            for char in text:
-                result += subscript_map.get(char, char)
-            return result
+            return (match.group(1) or match.group(2)).translate(_SUB_TBL)
 
-        latex = re.sub(r"_{([^}]+)}|_([a-zA-Z0-9])", replace_subscript, latex)
+        latex = _RE_SUB.sub(replace_subscript, latex)
 
         # Clean up remaining LaTeX commands
-        latex = re.sub(r"\\[a-zA-Z]+\{([^}]*)\}", r"\1", latex)
-        latex = re.sub(r"\\[a-zA-Z]+", "", latex)
+        latex = _RE_CMD_ARG.sub(r"\1", latex)
+        latex = _RE_CMD.sub("", latex)
 
         # Clean up braces and extra spaces
         latex = latex.replace("{", "").replace("}", "")
-        latex = re.sub(r"\s+", " ", latex).strip()
+        latex = _RE_WS.sub(" ", latex).strip()
 
         return latex
 
     @cpu_bound
     def _preprocess_latex_in_markdown(self, text: str) -> str:
         """Convert LaTeX to Unicode in markdown text while preserving structure"""
+        if "$" not in text:
+            return text
+
         code_blocks: List[str] = []
-        code_pattern = re.compile(r"```[\s\S]*?```|`[^`\n]+`")
 
-        def store_code(match: Match[str]) -> str:
-            idx = len(code_blocks)
-            code_blocks.append(match.group(0))
-            return f"__CODE_BLOCK_{idx}__"
+        if "`" in text:
+
+            def store_code(match: Match[str]) -> str:
+                idx = len(code_blocks)
+                code_blocks.append(match.group(0))
+                return f"\x00CB{idx}\x00"
 
-        text = code_pattern.sub(store_code, text)
+            text = _RE_CODE.sub(store_code, text)
 
         # Process display math ($$...$$)
         def replace_display(match: Match[str]) -> str:
             latex = self._latex_to_unicode(match.group(1))
             return f"**{latex}**"
 
-        text = re.sub(r"\$\$(.*?)\$\$", replace_display, text, flags=re.DOTALL)
+        text = _RE_DISPLAY.sub(replace_display, text)
 
         # Process inline math ($...$)
         def replace_inline(match: Match[str]) -> str:
             latex = self._latex_to_unicode(match.group(1))
             return f"_{latex}_"
 
-        text = re.sub(r"(?<!\$)\$(?!\$)([^$\n]+?)\$(?!\$)", replace_inline, text)
+        text = _RE_INLINE.sub(replace_inline, text)
 
-        for idx, code_block in enumerate(code_blocks):
-            text = text.replace(f"__CODE_BLOCK_{idx}__", code_block)
+        if code_blocks:
+            text = _RE_CODE_SENTINEL.sub(
+                lambda m: code_blocks[int(m.group(1))], text
+            )
 
         return text
 
     async def _extract_content_structure(self, raw_text: str) -> List[Any]:
         """Pre-process LaTeX then extract structure using telegramify"""
-        processed_text = await self._preprocess_latex_in_markdown(raw_text)
+        # No dollar sign means no math; skip the executor round trip
+        if "$" in raw_text:
+            processed_text = await self._preprocess_latex_in_markdown(raw_text)
+        else:
+            processed_text = raw_text
 
         boxes = await telegramify_markdown.telegramify(
             content=processed_text,
-            max_word_count=Config.SAFE_MESSAGE_LENGTH,
+            max_word_count=CONFIG.SAFE_MESSAGE_LENGTH,
             latex_escape=False,
             normalize_whitespace=True,
         )
@@ -320,8 +376,7 @@ class MessageFormatter:
 
     def _escape_code_content(self, code: str) -> str:
         """Properly escape code content for MarkdownV2 code blocks"""
-        # Inside code blocks, only backticks need escaping
-        return code.replace("`", "\\`")
+        return code.translate(_BACKTICK_ESCAPE)
 
     def _create_code_block(self, code: str, lang: str) -> str:
         """Create a properly formatted code block for Telegram MarkdownV2"""
@@ -330,25 +385,16 @@ class MessageFormatter:
 
     @cpu_bound
     def _process_file_box(
-        self, box: telegramify_markdown.type.File, file_type_counter: Dict[str, int]
+        self, box: telegramify_markdown.type.File, ext: str, seq: int, asset_id: str
     ) -> Tuple[Asset, List[str]]:
-        """Process File box"""
-
-        ext = (
-            box.file_name[box.file_name.rfind(".") + 1 :]
-            if "." in box.file_name
-            else "txt"
-        )
-
-        if ext not in file_type_counter:
-            file_type_counter[ext] = 0
-        file_type_counter[ext] += 1
+        """Process File box; extension sequence and asset id are assigned
+        by the caller, so concurrent calls share no state"""
 
         telegram_lang = map_extension_to_lang(ext)
-        generated_filename = f"{telegram_lang}_code_{file_type_counter[ext]}.{ext}"
+        generated_filename = f"{telegram_lang}_code_{seq}.{ext}"
 
         asset = Asset(
-            asset_id=f"asset_{sum(file_type_counter.values())}",
+            asset_id=asset_id,
             file_name=generated_filename,
             file_data=box.file_data,
             language=telegram_lang,
@@ -357,8 +403,8 @@ class MessageFormatter:
 
         code_str = box.file_data.decode("utf-8", errors="replace")
 
-        fence_overhead = len(f"```{telegram_lang}\n\n```")
-        max_code_size = Config.MAX_MESSAGE_LENGTH - fence_overhead - 100
+        fence_overhead = _FENCE_OVERHEAD_BASE + len(telegram_lang)
+        max_code_size = CONFIG.MAX_MESSAGE_LENGTH - fence_overhead - 100
 
         wrapped_parts = []
 
@@ -371,130 +417,186 @@ class MessageFormatter:
             )
 
             lines = code_str.split("\n")
-            current_chunk_lines: List[str] = []
-            current_chunk_size = 0
-
-            for line in lines:
-                line_size = len(line) + 1
-
-                if (
-                    current_chunk_size + line_size > max_code_size
-                    and current_chunk_lines
-                ):
-                    chunk_content = "\n".join(current_chunk_lines)
-                    wrapped_chunk = self._create_code_block(
-                        chunk_content, telegram_lang
-                    )
-                    wrapped_parts.append(wrapped_chunk)
-
-                    current_chunk_lines = [line]
-                    current_chunk_size = line_size
-                else:
-                    current_chunk_lines.append(line)
-                    current_chunk_size += line_size
-
-            if current_chunk_lines:
-                chunk_content = "\n".join(current_chunk_lines)
-                wrapped_chunk = self._create_code_block(chunk_content, telegram_lang)
-                wrapped_parts.append(wrapped_chunk)
+            # Prefix sums of line sizes (newline included) let bisect find
+            # each chunk boundary in O(log n) instead of walking per line
+            cum = list(accumulate(len(line) + 1 for line in lines))
+
+            start = 0
+            base = 0
+            while start < len(lines):
+                end = bisect_right(cum, base + max_code_size)
+                if end <= start:
+                    # Single line longer than the limit: emit it alone,
+                    # as the old per-line loop did
+                    end = start + 1
+                chunk_content = "\n".join(lines[start:end])
+                wrapped_parts.append(
+                    self._create_code_block(chunk_content, telegram_lang)
+                )
+                base = cum[end - 1]
+                start = end
 
         return (asset, wrapped_parts)
 
+    def _collect_text_box(
+        self,
+        box: Any,
+        slots: List[Tuple[str, Any]],
+        file_jobs: List[Any],
+        file_type_counter: Dict[str, int],
+    ) -> None:
+        text = self._process_text_box(box)
+        if text:
+            slots.append(("text", text))
+
+    def _collect_file_box(
+        self,
+        box: Any,
+        slots: List[Tuple[str, Any]],
+        file_jobs: List[Any],
+        file_type_counter: Dict[str, int],
+    ) -> None:
+        # Assign the per-extension sequence and asset id here so the
+        # rendering calls are independent of each other
+        ext = os.path.splitext(box.file_name)[1][1:].lower() or "txt"
+        file_type_counter[ext] = file_type_counter.get(ext, 0) + 1
+        asset_id = f"asset_{len(file_jobs) + 1}"
+
+        slots.append(("file", len(file_jobs)))
+        file_jobs.append(
+            self._process_file_box(box, ext, file_type_counter[ext], asset_id)
+        )
+
+    def _collect_photo_box(
+        self,
+        box: Any,
+        slots: List[Tuple[str, Any]],
+        file_jobs: List[Any],
+        file_type_counter: Dict[str, int],
+    ) -> None:
+        logger.info(f"Photo box found: {box}")
+
+    # One dict lookup per box instead of an isinstance chain; keyed on
+    # __class__ so spec'd test doubles dispatch like the real types
+    _BOX_HANDLERS = {
+        telegramify_markdown.type.Text: _collect_text_box,
+        telegramify_markdown.type.File: _collect_file_box,
+        telegramify_markdown.type.Photo: _collect_photo_box,
+    }
+
     async def _assemble_message_parts(
         self, boxes: List[Any]
     ) -> Tuple[List[str], List[Asset]]:
-        """Process all boxes"""
-        string_parts = []
-        assets = []
+        """Process all boxes; file boxes render concurrently"""
+        slots: List[Tuple[str, Any]] = []
+        file_jobs: List[Any] = []
         file_type_counter: Dict[str, int] = {}
 
         for box in boxes:
-            if isinstance(box, telegramify_markdown.type.Text):
-                text = self._process_text_box(box)
-                if text:
-                    string_parts.append(text)
-
-            elif isinstance(box, telegramify_markdown.type.File):
-                asset, wrapped_parts = await self._process_file_box(
-                    box, file_type_counter
-                )
+            handler = self._BOX_HANDLERS.get(box.__class__)
+            if handler is not None:
+                handler(self, box, slots, file_jobs, file_type_counter)
+
+        # One gather wave through the executor instead of awaiting each
+        # file box in turn
+        file_results = await asyncio.gather(*file_jobs) if file_jobs else []
+
+        string_parts: List[str] = []
+        assets: List[Asset] = []
+        for kind, payload in slots:
+            if kind == "text":
+                string_parts.append(payload)
+            else:
+                asset, wrapped_parts = file_results[payload]
                 assets.append(asset)
                 string_parts.extend(wrapped_parts)
 
-            elif isinstance(box, telegramify_markdown.type.Photo):
-                logger.info(f"Photo box found: {box}")
-
         return (string_parts, assets)
 
-    @cpu_bound
     def _merge_into_messages(self, string_parts: List[str]) -> List[str]:
         """Merge string parts into messages"""
         if not string_parts:
             return []
 
         messages = []
-        current_message = ""
+        # Accumulate parts in a list and join once per flush; repeated
+        # string += reallocates the whole message on every part
+        current_parts: List[str] = []
+        current_len = 0
 
         for string_part in string_parts:
             if not string_part:
                 continue
 
             part_len = len(string_part)
-            current_len = len(current_message)
 
-            if part_len > Config.MAX_MESSAGE_LENGTH:
+            if part_len > CONFIG.MAX_MESSAGE_LENGTH:
                 logger.warning(
                     f"Part exceeds limit ({part_len} chars), will try to send anyway"
                 )
-                if current_message:
-                    messages.append(current_message)
-                    current_message = ""
+                if current_parts:
+                    messages.append("\n\n".join(current_parts))
+                    current_parts = []
+                    current_len = 0
                 messages.append(string_part)
                 continue
 
             if (
-                current_message
-                and current_len + 2 + part_len <= Config.MAX_MESSAGE_LENGTH
+                current_parts
+                and current_len + 2 + part_len <= CONFIG.MAX_MESSAGE_LENGTH
             ):
-                current_message += "\n\n" + string_part
-            elif not current_message:
-                current_message = string_part
+                current_parts.append(string_part)
+                current_len += 2 + part_len
+            elif not current_parts:
+                current_parts = [string_part]
+                current_len = part_len
             else:
-                messages.append(current_message)
-                current_message = string_part
+                messages.append("\n\n".join(current_parts))
+                current_parts = [string_part]
+                current_len = part_len
 
-        if current_message:
-            messages.append(current_message)
+        if current_parts:
+            messages.append("\n\n".join(current_parts))
 
         return messages
 
-    @cpu_bound
     def _validate_markdown_v2(self, text: str) -> Tuple[bool, List[str]]:
         """
         Validate that text is properly escaped for MarkdownV2
         Returns (is_valid, list_of_issues)
         """
         issues = []
-        special_chars = r"_*[]()~`>#+-=|{}.!"
 
-        # Skip validation inside code blocks
-        code_ranges = []
-        for match in re.finditer(r"```[\s\S]*?```", text):
-            code_ranges.append((match.start(), match.end()))
+        # Scan only the gaps between code fences; specials inside fences
+        # are legal. Passing pos/endpos keeps original indices and lets the
+        # lookbehind see the preceding backslash.
+        pos = 0
+        for fence in _RE_CODEFENCE.finditer(text):
+            for m in _RE_UNESCAPED.finditer(text, pos, fence.start()):
+                issues.append(f"Unescaped '{m.group()}' at position {m.start()}")
+            pos = fence.end()
+        for m in _RE_UNESCAPED.finditer(text, pos):
+            issues.append(f"Unescaped '{m.group()}' at position {m.start()}")
+
+        return (len(issues) == 0, issues)
 
-        i = 0
-        while i < len(text):
-            # Skip if inside code block
-            in_code = any(start <= i < end for start, end in code_ranges)
+    @cpu_bound
+    def _finalize_messages(self, string_parts: List[str]) -> List[str]:
+        """Merge parts into messages and validate them in one executor hop"""
+        messages = self._merge_into_messages(string_parts)
+        logger.info(f"Merged into {len(messages)} messages")
 
-            if not in_code and i < len(text) and text[i] in special_chars:
-                # Check if escaped
-                if i == 0 or text[i - 1] != "\\":
-                    issues.append(f"Unescaped '{text[i]}' at position {i}")
+        for i, msg in enumerate(messages):
+            if len(msg) > CONFIG.MAX_MESSAGE_LENGTH:
+                logger.warning(f"Message {i+1} exceeds limit: {len(msg)} chars")
 
-            i += 1
+            # Check for markdown issues
+            is_valid, issues = self._validate_markdown_v2(msg)
+            if not is_valid and issues:
+                for issue in issues[:3]:
+                    logger.warning(f"Message {i+1}: {issue}")
 
-        return (len(issues) == 0, issues)
+        return messages
 
     async def format_response_for_telegram(
         self, raw_text: str
@@ -520,20 +622,8 @@ class MessageFormatter:
                 f"Assembled {len(string_parts)} string parts, {len(assets)} assets"
             )
 
-            # Step 3: Merge parts into messages
-            messages = await self._merge_into_messages(string_parts)
-            logger.info(f"Merged into {len(messages)} messages")
-
-            # Step 4: Validate messages
-            for i, msg in enumerate(messages):
-                if len(msg) > Config.MAX_MESSAGE_LENGTH:
-                    logger.warning(f"Message {i+1} exceeds limit: {len(msg)} chars")
-
-                # Check for markdown issues
-                is_valid, issues = await self._validate_markdown_v2(msg)
-                if not is_valid and issues:
-                    for issue in issues[:3]:
-                        logger.warning(f"Message {i+1}: {issue}")
+            # Steps 3+4: Merge and validate in a single executor round trip
+            messages = await self._finalize_messages(string_parts)
 
             return (messages, assets)
 
@@ -543,10 +633,10 @@ class MessageFormatter:
             # Fallback: escape and split plain text
             escaped = escape_markdown(raw_text)
 
-            if len(escaped) <= Config.MAX_MESSAGE_LENGTH:
+            if len(escaped) <= CONFIG.MAX_MESSAGE_LENGTH:
                 return ([escaped], [])
             else:
                 messages = []
-                for i in range(0, len(escaped), Config.SAFE_MESSAGE_LENGTH):
-                    messages.append(escaped[i : i + Config.SAFE_MESSAGE_LENGTH])
+                for i in range(0, len(escaped), CONFIG.SAFE_MESSAGE_LENGTH):
+                    messages.append(escaped[i : i + CONFIG.SAFE_MESSAGE_LENGTH])
                 return (messages, [])
@@ -1,12 +1,18 @@
-from config import Config, logger
+from config import CONFIG, logger
 from storage import DatabaseManager
 
 import asyncio
+import json
 import jinja2
+from collections import OrderedDict
 from typing import Optional
 from pyngrok import ngrok
 from aiohttp import web
 
+# Rendered pages worth keeping in memory; pages are immutable once saved,
+# so the only eviction pressure is size
+_PAGE_CACHE_CAP = 256
+
 
 class WebServer:
     """AIOHTTP server for hosting messages with correct format"""
@@ -276,7 +282,19 @@ class WebServer:
         self.runner: Optional[web.AppRunner] = None
         self.public_url: Optional[str] = None
 
+        # The template has a single dynamic spot; splitting around it lets
+        # view_answer skip the Jinja interpreter and just json.dumps the
+        # content. The Template stays as a fallback should the marker move.
         self.template = jinja2.Template(self.HTML_TEMPLATE)
+        # The static halves are ~6 KB; encode them once so each response
+        # only encodes the content payload
+        head, sep, tail = self.HTML_TEMPLATE.partition("{{ content|tojson }}")
+        self._head_b = head.encode("utf-8") if sep else None
+        self._tail_b = tail.encode("utf-8") if sep else None
+
+        # LRU of rendered pages, same shape as the storage-layer caches;
+        # repeat views of a page skip both the DB read and the render
+        self._page_cache: "OrderedDict[str, bytes]" = OrderedDict()
         self._setup_routes()
 
     def _setup_routes(self) -> None:
@@ -285,13 +303,47 @@ class WebServer:
 
     async def view_answer(self, request: web.Request) -> web.Response:
         page_id = request.match_info["page_id"]
+
+        body = self._page_cache.get(page_id)
+        if body is not None:
+            self._page_cache.move_to_end(page_id)
+            return web.Response(
+                body=body, content_type="text/html", charset="utf-8"
+            )
+
         content = await self.storage.load_web_page(page_id)
 
         if content is None:
             raise web.HTTPNotFound(text="Page not found")
 
-        html = self.template.render(content=content)
-        return web.Response(text=html, content_type="text/html")
+        if self._head_b is not None:
+            body = b"".join(
+                (self._head_b, self._dump_content(content).encode("utf-8"), self._tail_b)
+            )
+        else:
+            body = self.template.render(content=content).encode("utf-8")
+
+        self._page_cache[page_id] = body
+        while len(self._page_cache) > _PAGE_CACHE_CAP:
+            self._page_cache.popitem(last=False)
+
+        return web.Response(body=body, content_type="text/html", charset="utf-8")
+
+    def invalidate(self, page_id: str) -> None:
+        """Drop a cached page; for callers that ever rewrite one"""
+        self._page_cache.pop(page_id, None)
+
+    @staticmethod
+    def _dump_content(content: str) -> str:
+        """JSON-encode content with the same script-safe escapes as
+        Jinja's |tojson filter"""
+        return (
+            json.dumps(content)
+            .replace("<", "\\u003c")
+            .replace(">", "\\u003e")
+            .replace("&", "\\u0026")
+            .replace("'", "\\u0027")
+        )
 
     async def start(self) -> None:
         """Start web server and ngrok"""
@@ -308,12 +360,12 @@ class WebServer:
         """Initialize ngrok in a separate thread to avoid blocking the loop"""
         loop = asyncio.get_running_loop()
 
-        if Config.NGROK_AUTH_TOKEN:
-            ngrok.set_auth_token(Config.NGROK_AUTH_TOKEN)
+        if CONFIG.NGROK_AUTH_TOKEN:
+            ngrok.set_auth_token(CONFIG.NGROK_AUTH_TOKEN)
 
         ngrok_kwargs = {"addr": self.port}
-        if Config.NGROK_DOMAIN:
-            ngrok_kwargs["domain"] = Config.NGROK_DOMAIN
+        if CONFIG.NGROK_DOMAIN:
+            ngrok_kwargs["domain"] = CONFIG.NGROK_DOMAIN
 
         try:
             tunnel = await loop.run_in_executor(